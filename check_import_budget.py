@@ -0,0 +1,86 @@
+"""Measure the cold-start cost of the Streamlit apps and enforce a budget.
+
+Each app is executed once in a fresh interpreter with Streamlit's AppTest
+harness, so the measurement includes every import the script triggers on its
+first run. The check fails if a run exceeds the time budget or if any of the
+heavy optional dependencies were loaded before the feature needing them was
+used.
+
+Usage:
+    python check_import_budget.py
+    python check_import_budget.py --budget 2.5 streamlit_engagement_dashboard.py
+"""
+import argparse
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+APPS = [
+    "streamlit_engagement_dashboard.py",
+    "skool_community_post_analysis.py",
+]
+
+# Modules that must not be loaded by a plain page view
+FORBIDDEN_MODULES = [
+    "selenium",
+    "webdriver_manager",
+    "dotenv",
+    "openpyxl",
+    "matplotlib",
+]
+
+DEFAULT_BUDGET_SECONDS = 3.0
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+from streamlit.testing.v1 import AppTest
+imported = time.perf_counter()
+AppTest.from_file({app!r}, default_timeout=60).run()
+finished = time.perf_counter()
+print(json.dumps({{
+    "streamlit_import": imported - start,
+    "total": finished - start,
+    "loaded": [m for m in {forbidden!r} if m in sys.modules],
+}}))
+"""
+
+
+def measure_app(app_path):
+    """Run an app once in a fresh interpreter and return its timings."""
+    probe = _PROBE.format(app=str(app_path), forbidden=FORBIDDEN_MODULES)
+    result = subprocess.run(
+        [sys.executable, "-c", probe], capture_output=True, text=True,
+        cwd=Path(app_path).parent)
+    if result.returncode != 0:
+        raise RuntimeError(f"Could not run {app_path}:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("apps", nargs="*", default=APPS,
+                        help="App scripts to measure (default: both apps)")
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET_SECONDS,
+                        help="Maximum cold-start time per app in seconds")
+    args = parser.parse_args(argv)
+
+    here = Path(__file__).parent
+    failed = False
+    for app in args.apps:
+        timings = measure_app(here / app)
+        status = "ok"
+        if timings["total"] > args.budget:
+            status = f"over budget ({args.budget:.2f}s)"
+            failed = True
+        if timings["loaded"]:
+            status = f"loaded {', '.join(timings['loaded'])}"
+            failed = True
+        print(f"{app}: {timings['total']:.2f}s total "
+              f"({timings['streamlit_import']:.2f}s importing Streamlit) - {status}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,832 @@
+"""Streamlit-independent analytics behind the engagement dashboards.
+
+Every view is split into a compute step that turns the posts table into a
+small data frame, and a render step that turns that frame into a Plotly
+figure or an HTML table. The Streamlit apps and the batch report generator
+are thin renderers over these functions.
+
+compute_report runs every compute step for one dataset and month in a
+batch, memoised in a process-wide result cache keyed by a fingerprint of
+the data, so each view is computed once however many apps, sessions or
+reports ask for it. `python skool_analytics.py benchmark posts.csv` times
+the compute steps, and `python skool_analytics.py compare a.csv=Owner b.csv`
+compares communities side by side.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from html import escape
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+DATE_FORMAT = "%d/%m/%Y"
+MONTH_FORMAT = "%B %Y"
+LEADERBOARD_METRICS = ["Posts", "Likes", "Comments", "Total Engagement"]
+
+# Time-series charts use the smallest bucket that keeps at most this many
+# bars, and switch to WebGL once a figure holds more than WEBGL_THRESHOLD points
+MAX_TIME_BUCKETS = 400
+WEBGL_THRESHOLD = 2000
+TIME_BUCKETS = ["D", "W", "M"]
+BUCKET_LABELS = {"D": "Day", "W": "Week", "M": "Month"}
+_BUCKET_HOVER = {"D": "%{x|%d %b %Y}", "W": "w/c %{x|%d %b %Y}", "M": "%{x|%B %Y}"}
+RETENTION_WEEKS = 12
+
+# Posts and comments tables can be plain CSV, gzip- or zstd-compressed CSV or
+# Parquet; the format is told from the first bytes of the file
+TABLE_EXTENSIONS = ["csv", "gz", "zst", "parquet"]
+_TABLE_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd", b"PAR1": "parquet"}
+
+# Page styles shared by the dashboard and the static reports
+DASHBOARD_CSS = """
+    <style>
+        @media print {
+            h1, h2, h3, h4, h5, h6, p, div, table, thead, tbody, tfoot, tr, th, td {
+                page-break-inside: avoid;
+            }
+            .page-break {
+                page-break-before: always;
+            }
+            .chart-container {
+                page-break-inside: avoid;
+                page-break-before: auto;
+                page-break-after: auto;
+                margin-bottom: 20px; /* Reduced spacing for printing */
+            }
+            body {
+                -webkit-print-color-adjust: exact;
+                font-size: 14px; /* Adjust font size for readability in print */
+            }
+            table {
+                page-break-inside: avoid;
+                margin-bottom: 20px;
+            }
+        }
+        body {
+            font-family: Arial, sans-serif;
+        }
+        h1 {
+            margin-bottom: 0px !important;
+            text-align: center;
+            font-weight: bold;
+            font-size: 28px; /* Larger font for main title */
+        }
+        h2 {
+            text-align: center;
+            font-weight: bold;
+            font-size: 22px;
+            margin-bottom: 5px;
+            margin-top: 10px;
+        }
+        h3 {
+            text-align: center;
+            margin-top: 0px !important;
+            margin-bottom: 10px;
+            font-size: 18px; /* Consistent subheading size */
+        }
+        h4.leaderboard-header {
+            text-align: center;
+            margin-top: 5px;
+            margin-bottom: 5px;
+            font-weight: bold;
+            font-size: 16px;
+        }
+        .leaderboard-table {
+            margin-top: 0px;
+            page-break-inside: avoid;
+        }
+        table.custom-table {
+            width: 100%;
+            border-collapse: collapse;
+            margin-top: 10px;
+            margin-bottom: 10px;
+        }
+        th, td {
+            border: 1px solid #444;
+            padding: 8px;
+            text-align: center;
+            font-size: 14px;
+        }
+        th {
+            background-color: #444;
+            color: white;
+            height: 40px;
+            text-align: center;
+        }
+        td img {
+            width: 25px;
+            height: 25px;
+            border-radius: 50%;
+        }
+        th.rank, td.rank {
+            width: 60px;
+        }
+        th.profile-picture, td.profile-picture {
+            width: 60px;
+        }
+        th.name, td.name {
+            width: 200px;
+        }
+        th.metric, td.metric {
+            width: 50px;
+        }
+        caption {
+            font-size: 2em;
+            margin-bottom: 10px;
+            font-weight: bold;
+            text-align: center;
+        }
+    </style>
+"""
+
+LEADERBOARD_CSS = (
+    "<style>"
+    "table {width: 100%; border-collapse: collapse;}"
+    "th, td {border: 1px solid #444; padding: 8px; text-align: center; font-size: 14px;}"
+    "th {background-color: #444; color: white; height: 40px; text-align: center;}"
+    "td img {width: 25px; height: 25px; border-radius: 50%;}"
+    "th.rank, td.rank {width: 60px;}"
+    "th.profile-picture, td.profile-picture {width: 60px;}"
+    "th.name, td.name {width: 200px;}"
+    "th.metric, td.metric {width: 50px;}"
+    "caption {font-size: 2em; margin-bottom: 10px; font-weight: bold; text-align: center;}"
+    "</style>")
+
+
+# Loading and filtering
+
+def read_table(source, columns=None):
+    """Read a scraped posts or comments table from a path or a file's bytes.
+
+    Compressed CSV is decompressed block by block while pandas parses it, so
+    the inflated text is never held in memory at once. pyarrow is only
+    imported for compressed and Parquet files.
+    """
+    if isinstance(source, bytes):
+        head = source[:4]
+    else:
+        with open(source, 'rb') as f:
+            head = f.read(4)
+    table_format = next(
+        (name for magic, name in _TABLE_MAGIC.items() if head.startswith(magic)), "csv")
+    if table_format == "csv":
+        return pd.read_csv(BytesIO(source) if isinstance(source, bytes) else source,
+                           usecols=columns)
+
+    import pyarrow as pa
+    raw = pa.BufferReader(source) if isinstance(source, bytes) else pa.OSFile(str(source))
+    if table_format == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(raw, columns=columns).to_pandas()
+    with pa.CompressedInputStream(raw, table_format) as stream:
+        return pd.read_csv(stream, usecols=columns)
+
+
+def prepare_posts(df):
+    """Parse dates and counts of a scraped posts table, in place."""
+    df['Post Date'] = pd.to_datetime(df['Post Date'], format=DATE_FORMAT)
+    for column in ['Likes', 'Comments']:
+        df[column] = pd.to_numeric(
+            df[column], errors='coerce').fillna(0).astype(int)
+    df['Total Engagement'] = df['Likes'] + df['Comments']
+    return df
+
+
+def prepare_comments(comments_df):
+    """Parse the comment dates of a deep-scrape comments table, in place."""
+    comments_df['Comment Date'] = pd.to_datetime(
+        comments_df['Comment Date'], format=DATE_FORMAT)
+    return comments_df
+
+
+def month_options(df, date_column='Post Date'):
+    """Months present in the data, in the order they first appear."""
+    months = df[date_column].dt.to_period('M').dropna().unique()
+    return [month.strftime(MONTH_FORMAT) for month in months]
+
+
+def filter_month(df, month, date_column='Post Date'):
+    """Restrict a table to one month ('All' keeps everything)."""
+    if month == 'All':
+        return df
+    # Comparing against the month's bounds avoids formatting every date
+    start = pd.to_datetime(month, format=MONTH_FORMAT)
+    dates = df[date_column]
+    return df[(dates >= start) & (dates < start + pd.offsets.MonthBegin(1))]
+
+
+# Compute steps
+
+def choose_time_bucket(start, end, min_bucket="D", max_points=MAX_TIME_BUCKETS):
+    """Pick the smallest bucket, at least min_bucket, that covers start..end
+    in no more than max_points buckets."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    buckets_needed = {"D": days, "W": days / 7, "M": days / 30.4}
+    candidates = TIME_BUCKETS[TIME_BUCKETS.index(min_bucket):]
+    for bucket in candidates:
+        if buckets_needed[bucket] <= max_points:
+            return bucket
+    return candidates[-1]
+
+
+def posts_over_time(df, min_bucket="D", max_points=MAX_TIME_BUCKETS):
+    """Posts per time bucket, one column per category.
+
+    Returns (bucket, frame) where frame has a 'Period' column holding each
+    bucket's start date. The bucket is chosen from the range of the data.
+    """
+    if df.empty:
+        return min_bucket, pd.DataFrame(columns=['Period'])
+    bucket = choose_time_bucket(
+        df['Post Date'].min(), df['Post Date'].max(), min_bucket, max_points)
+    periods = df['Post Date'].dt.to_period(bucket).dt.start_time.rename('Period')
+    counts = df.groupby([periods, 'Category']).size().unstack(fill_value=0)
+    return bucket, counts.reset_index()
+
+
+def category_counts(df):
+    """Number of posts per category, largest first."""
+    counts = df['Category'].value_counts().sort_values(ascending=False).reset_index()
+    counts.columns = ['Category', 'Count']
+    return counts
+
+
+def owner_vs_members(df, owner_name):
+    """Post counts of the community owner against everyone else."""
+    owner_posts_count = int((df['Name'] == owner_name).sum())
+    return pd.DataFrame({
+        'User Type': ['Owner', 'Members'],
+        'Count': [owner_posts_count, len(df) - owner_posts_count]
+    })
+
+
+def top_posts(df, n=5, exclude_name=None):
+    """The n posts with the highest total engagement."""
+    if exclude_name:
+        df = df[df['Name'] != exclude_name]
+    top = df.sort_values(by='Total Engagement', ascending=False).head(n)
+    return top[['Name', 'Title', 'Likes', 'Comments', 'Total Engagement']].reset_index(drop=True)
+
+
+def leaderboard(df, metric='Posts', comments_df=None, n=20):
+    """Top n members by a metric, with rank and profile picture."""
+    if metric == "Posts":
+        board = df['Name'].value_counts().reset_index()
+        board.columns = ['Name', 'Posts']
+    elif metric in ("Likes", "Comments", "Total Engagement"):
+        board = df.groupby('Name')[metric].sum(
+        ).sort_values(ascending=False).reset_index()
+    elif metric == "Comments Given":
+        board = comments_df['Commenter'].value_counts().reset_index()
+        board.columns = ['Name', 'Comments Given']
+    else:
+        raise ValueError(f"Unknown leaderboard metric: {metric}")
+
+    pictures = df[['Name', 'Profile Picture']]
+    if metric == "Comments Given":
+        # Commenters may never have posted, so take their pictures from the comments
+        pictures = comments_df[['Commenter', 'Profile Picture']].rename(
+            columns={'Commenter': 'Name'}).drop_duplicates(subset='Name')
+    board = board.merge(
+        pictures.drop_duplicates(), on='Name', how='left').head(n)
+    board.reset_index(drop=True, inplace=True)
+    board.insert(0, 'Rank', board.index + 1)
+    return board
+
+
+def retention_matrix(df, weeks=RETENTION_WEEKS):
+    """Weekly cohorts of members by first post, and how many post again.
+
+    Row i is the cohort whose first post falls in week i (weeks start on
+    Monday), column k the number of its members who posted k weeks later;
+    column 0 is the cohort size. Weeks after the end of the data are NaN.
+    Members and weeks are mapped to integer codes and the matrix is filled
+    with a single bincount.
+    """
+    columns = list(range(weeks + 1))
+    if df.empty:
+        return pd.DataFrame(columns=columns, index=pd.DatetimeIndex([], name='Cohort'))
+    member_codes, members = pd.factorize(df['Name'])
+    days = df['Post Date'].to_numpy().astype('datetime64[D]').astype(np.int64)
+    week_codes = (days + 3) // 7  # 1 Jan 1970 was a Thursday
+    first_week = week_codes.min()
+    week_codes -= first_week
+    n_weeks = int(week_codes.max()) + 1
+
+    # One activity per member and week
+    active = np.unique(member_codes * n_weeks + week_codes)
+    active_members, active_weeks = np.divmod(active, n_weeks)
+
+    # np.unique sorts by member, then week, so each member's first entry is their cohort
+    is_first = np.r_[True, active_members[1:] != active_members[:-1]]
+    cohort_of_member = active_weeks[is_first]
+    cohorts = cohort_of_member[active_members]
+    offsets = active_weeks - cohorts
+
+    within = offsets <= weeks
+    counts = np.bincount(cohorts[within] * (weeks + 1) + offsets[within],
+                         minlength=n_weeks * (weeks + 1)).reshape(n_weeks, weeks + 1)
+    matrix = counts.astype(float)
+    matrix[np.arange(n_weeks)[:, None] + np.arange(weeks + 1) >= n_weeks] = np.nan
+
+    week_starts = pd.to_datetime((np.arange(n_weeks) + first_week) * 7 - 3, unit='D')
+    retention = pd.DataFrame(matrix, columns=columns,
+                             index=pd.DatetimeIndex(week_starts, name='Cohort'))
+    return retention[counts[:, 0] > 0]
+
+
+def month_cohorts(retention, month):
+    """The cohorts of a retention matrix whose week overlaps a month.
+
+    The matrix is computed over the whole dataset, so cohorts start at each
+    member's first post ever and keep counting activity after the month.
+    """
+    if month == 'All':
+        return retention
+    start = pd.to_datetime(month, format=MONTH_FORMAT)
+    weeks = retention.index
+    return retention[(weeks < start + pd.offsets.MonthBegin(1))
+                     & (weeks + pd.Timedelta(days=7) > start)]
+
+
+# Result cache and batch reports
+
+class ResultCache:
+    """A thread-safe LRU cache of computed views."""
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._pending = {}  # key -> Future of a computation in progress
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, key, compute):
+        """The result for key, computed once even if several threads miss at once."""
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+            pending = self._pending.get(key)
+            computing = pending is None
+            if computing:
+                pending = self._pending[key] = Future()
+        if not computing:
+            return pending.result()
+
+        # Computed outside the lock so other views are not held up
+        try:
+            result = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._pending[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+            del self._pending[key]
+        pending.set_result(result)
+        return result
+
+    def get(self, key):
+        """The cached result for key, or None."""
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._results.clear()
+
+
+result_cache = ResultCache()
+
+
+def dataset_fingerprint(df):
+    """A content hash identifying a posts or comments table."""
+    if df is None:
+        return None
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    return hashlib.sha1(hashes.tobytes()).hexdigest()
+
+
+# Views of a report: name -> compute(df, comments_df, owner). Only the
+# owner views depend on the owner, and only "Comments Given" on the comments.
+# Retention is not a month view: it is computed over the whole dataset and
+# the month picks its cohorts (see compute_report).
+REPORT_VIEWS = {
+    "posts_by_day": lambda df, comments_df, owner: posts_over_time(df, "D"),
+    "posts_by_week": lambda df, comments_df, owner: posts_over_time(df, "W"),
+    "categories": lambda df, comments_df, owner: category_counts(df),
+    "top_posts": lambda df, comments_df, owner: top_posts(df),
+    **{f"leaderboard:{metric}": (lambda df, comments_df, owner, metric=metric: leaderboard(df, metric))
+       for metric in LEADERBOARD_METRICS},
+}
+OWNER_VIEWS = {
+    "owner_vs_members": lambda df, comments_df, owner: owner_vs_members(df, owner),
+    "top_posts_excluding_owner": lambda df, comments_df, owner: top_posts(df, exclude_name=owner),
+}
+COMMENT_VIEWS = {
+    "leaderboard:Comments Given":
+        lambda df, comments_df, owner: leaderboard(df, "Comments Given", comments_df),
+}
+
+
+def compute_report(df, month='All', owner=None, comments_df=None,
+                   fingerprint=None, comments_fingerprint=None, cache=result_cache):
+    """Every view of one dataset and month, as a dict of name -> result.
+
+    df and comments_df are the prepared, unfiltered tables. Results are
+    memoised in cache under the dataset fingerprints (computed from the data
+    unless given), so repeated calls only compute views not seen before.
+    Owner views are included when owner is given, and the Comments Given
+    leaderboard when comments_df has rows in the month. Retention is computed
+    once over the whole dataset and shows the cohorts of the month.
+    """
+    fingerprint = fingerprint or dataset_fingerprint(df)
+    if comments_df is not None and comments_fingerprint is None:
+        comments_fingerprint = dataset_fingerprint(comments_df)
+    filtered = {}
+
+    def month_data():
+        # Only filter when some view actually has to be computed
+        if not filtered:
+            filtered['df'] = filter_month(df, month)
+            filtered['comments_df'] = None if comments_df is None else filter_month(
+                comments_df, month, date_column='Comment Date')
+        return filtered['df'], filtered['comments_df']
+
+    def run(name, compute, key):
+        return cache.get_or_compute(
+            key, lambda: compute(*month_data(), owner))
+
+    report = {name: run(name, compute, (fingerprint, month, name))
+              for name, compute in REPORT_VIEWS.items()}
+    retention = cache.get_or_compute(
+        (fingerprint, 'All', "retention"), lambda: retention_matrix(df))
+    report["retention"] = month_cohorts(retention, month)
+    if owner:
+        report.update({name: run(name, compute, (fingerprint, month, name, owner))
+                       for name, compute in OWNER_VIEWS.items()})
+    if comments_df is not None:
+        for name, compute in COMMENT_VIEWS.items():
+            key = (fingerprint, comments_fingerprint, month, name)
+            board = run(name, compute, key)
+            if not board.empty:
+                report[name] = board
+    return report
+
+
+class ReportWarmup:
+    """Fills the result cache with the reports of several months in the background.
+
+    Months are computed one after another on a single daemon thread, 'All'
+    first and then the most recent month first, pausing between months so
+    that foreground work gets the interpreter. cancel() stops the thread
+    after the month in progress. The data is released once the thread ends.
+    """
+
+    def __init__(self, df, months, comments_df=None, fingerprint=None,
+                 comments_fingerprint=None, cache=result_cache, pause=0.05):
+        self.fingerprint = fingerprint or dataset_fingerprint(df)
+        self.months = sorted(
+            months, key=lambda month: (month != 'All', -_month_ordinal(month)))
+        self.months_done = 0
+        self._args = (df, comments_df, comments_fingerprint, cache)
+        self._pause = pause
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="report-warmup", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _run(self):
+        df, comments_df, comments_fingerprint, cache = self._args
+        try:
+            for month in self.months:
+                if self._cancelled.is_set():
+                    return
+                compute_report(df, month, None, comments_df, self.fingerprint,
+                               comments_fingerprint, cache=cache)
+                self.months_done += 1
+                self._cancelled.wait(self._pause)
+        finally:
+            self._args = None
+
+    def cancel(self):
+        self._cancelled.set()
+
+    @property
+    def running(self):
+        return self._thread.is_alive()
+
+
+def _month_ordinal(month):
+    if month == 'All':
+        return 0
+    period = pd.Period(pd.to_datetime(month, format=MONTH_FORMAT), freq='M')
+    return period.ordinal
+
+
+# Community comparison
+
+COMPARISON_METRICS = ['Posts per Day', 'Engagement per Post', 'Owner Share']
+COMPARISON_COLUMNS = ['Posts', 'Members', *COMPARISON_METRICS, 'Top Members']
+
+
+def community_summary(df, month='All', top=3):
+    """Size-independent metrics of one community, for side-by-side comparison.
+
+    Posts per day is taken over the days between the first and last post.
+    The summary does not depend on the owner; it keeps the posts per member
+    ('Member Posts') for owner_share instead.
+    """
+    posts = filter_month(df, month)
+    if posts.empty:
+        return {**dict.fromkeys(COMPARISON_COLUMNS), 'Member Posts': pd.Series(dtype=int)}
+    days = (posts['Post Date'].max() - posts['Post Date'].min()).days + 1
+    return {
+        'Posts': len(posts),
+        'Members': posts['Name'].nunique(),
+        'Posts per Day': round(len(posts) / days, 2),
+        'Engagement per Post': round(posts['Total Engagement'].mean(), 1),
+        'Top Members': ", ".join(leaderboard(posts, 'Total Engagement', n=top)['Name']),
+        'Member Posts': posts['Name'].value_counts(),
+    }
+
+
+def owner_share(summary, owner):
+    """Percentage of a community's posts made by the owner, or None without one."""
+    if not owner or not summary['Posts']:
+        return None
+    return round(100 * summary['Member Posts'].get(owner, 0) / summary['Posts'], 1)
+
+
+def load_community_summary(source, month='All'):
+    """Read, prepare and summarise one posts table; picklable for worker processes."""
+    return community_summary(prepare_posts(read_table(source)), month)
+
+
+def source_fingerprint(source):
+    """Identifies a table given as a path (by its mtime) or as file bytes (by content)."""
+    if isinstance(source, bytes):
+        return hashlib.sha1(source).hexdigest()
+    return f"{os.path.abspath(source)}:{os.path.getmtime(source)}"
+
+
+def compare_communities(sources, month='All', executor=None, cache=result_cache):
+    """One row of community_summary metrics per community.
+
+    sources is a list of (community, source, owner) with source a path or a
+    file's bytes. Summaries are memoised in cache under the source
+    fingerprint alone, so only new or changed datasets are read again, not
+    those whose owner changed; they are loaded and summarised in parallel on
+    executor (e.g. a process pool), or one after another without one.
+    """
+    summaries, waiting, futures = {}, {}, {}
+    for community, source, _ in sources:
+        key = (source_fingerprint(source), month, "summary")
+        summary = cache.get(key)
+        if summary is not None:
+            summaries[community] = summary
+        elif executor is not None:
+            if key not in futures:
+                futures[key] = executor.submit(load_community_summary, source, month)
+            waiting[community] = key
+        else:
+            summaries[community] = cache.get_or_compute(
+                key, lambda: load_community_summary(source, month))
+    for community, key in waiting.items():
+        summaries[community] = cache.get_or_compute(key, futures[key].result)
+
+    rows = {community: {**summaries[community],
+                        'Owner Share': owner_share(summaries[community], owner)}
+            for community, _, owner in sources}
+    comparison = pd.DataFrame.from_dict(rows, orient='index', columns=COMPARISON_COLUMNS)
+    comparison.index.name = 'Community'
+    return comparison
+
+
+# Render steps
+
+def _stacked_bar_layout(fig, x_title):
+    fig.update_layout(
+        xaxis=dict(title=x_title, tickfont=dict(size=16)),
+        yaxis=dict(title="Number of Posts", titlefont=dict(
+            size=16), tickfont=dict(size=16)),
+        barmode='stack',
+        template="plotly_dark",
+        margin=dict(t=50, b=50),
+        height=400
+    )
+    return fig
+
+
+def posts_over_time_figure(bucket, counts):
+    """Stacked chart of posts per time bucket by category.
+
+    Hover text is built client-side from a template rather than sent as one
+    string per bar. Past WEBGL_THRESHOLD points the bars become WebGL filled
+    areas, stacked by sending cumulative values; only those carry the
+    per-category counts as customdata for their hover text.
+    """
+    fig = go.Figure()
+    color_sequence = px.colors.qualitative.Plotly
+    categories = counts.columns[1:]
+    x = counts['Period'].dt.strftime('%Y-%m-%d').to_numpy()
+    hover = _BUCKET_HOVER[bucket] + ", %{y}<extra>%{fullData.name}</extra>"
+    stacked_hover = _BUCKET_HOVER[bucket] + ", %{customdata}<extra>%{fullData.name}</extra>"
+    use_webgl = len(x) * len(categories) > WEBGL_THRESHOLD
+    stacked = counts[categories].cumsum(axis=1)
+    for i, category in enumerate(categories):
+        color = color_sequence[i % len(color_sequence)]
+        values = counts[category].to_numpy()
+        if use_webgl:
+            fig.add_trace(go.Scattergl(
+                x=x, y=stacked[category].to_numpy(), customdata=values,
+                name=category, mode='lines', line=dict(width=0, color=color),
+                fill='tozeroy' if i == 0 else 'tonexty', hovertemplate=stacked_hover))
+        else:
+            fig.add_trace(go.Bar(
+                x=x, y=values, name=category,
+                marker_color=color, hovertemplate=hover))
+    return _stacked_bar_layout(fig, BUCKET_LABELS[bucket])
+
+
+def category_figure(counts):
+    """Bar chart of posts per category."""
+    fig = px.bar(counts, x='Category', y='Count', text='Count',
+                 color='Category', color_discrete_sequence=px.colors.qualitative.Plotly)
+    fig.update_layout(
+        xaxis_tickangle=-45,
+        yaxis_title="Number of Posts",
+        xaxis_title="Categories",
+        template="plotly_dark",
+        font=dict(size=16),
+        margin=dict(t=50, b=100)
+    )
+    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    return fig
+
+
+def comparison_figure(comparison, metric):
+    """Bar chart of one comparison metric across communities."""
+    data = comparison[metric].dropna().reset_index()
+    fig = px.bar(data, x='Community', y=metric, text=metric, color='Community',
+                 color_discrete_sequence=px.colors.qualitative.Plotly)
+    fig.update_layout(
+        showlegend=False,
+        xaxis_title="Community",
+        yaxis_title=metric,
+        template="plotly_dark",
+        font=dict(size=16),
+        margin=dict(t=50, b=50),
+        height=400
+    )
+    fig.update_traces(textposition='outside')
+    return fig
+
+
+def owner_vs_members_figure(pie_data):
+    """Pie chart of owner against member posts."""
+    pie_fig = px.pie(pie_data, values='Count', names='User Type',
+                     color_discrete_sequence=px.colors.qualitative.Plotly)
+    pie_fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        textfont_size=18,  # Make percentage text bigger
+        textfont_color='white'  # Set text color to white
+    )
+    pie_fig.update_layout(showlegend=False)  # Remove the legend
+    return pie_fig
+
+
+def retention_figure(retention):
+    """Heatmap of the share of each weekly cohort posting again k weeks later."""
+    sizes = retention[0]
+    share = retention.iloc[:, 1:].div(sizes, axis=0) * 100
+    labels = [f"w/c {week:%d/%m/%Y} ({int(size)})" for week, size in sizes.items()]
+    fig = go.Figure(go.Heatmap(
+        z=share.to_numpy(), x=[f"Week {k}" for k in share.columns], y=labels,
+        colorscale='Blues', zmin=0, zmax=100, colorbar=dict(title='%'),
+        text=retention.iloc[:, 1:].to_numpy(), xgap=1, ygap=1,
+        hovertemplate="%{y}<br>%{x}: %{z:.0f}% (%{text} members)<extra></extra>"))
+    fig.update_layout(
+        xaxis_title="Weeks After First Post",
+        yaxis_title="Cohort (Members)",
+        yaxis=dict(autorange='reversed'),
+        height=max(400, 22 * len(labels)),
+    )
+    return fig
+
+
+def leaderboard_html(board, metric, avatar_uri=None):
+    """Render a leaderboard as an HTML table.
+
+    avatar_uri maps a profile picture URL to the image source to embed, e.g.
+    AvatarCache.thumbnail_uri; by default the URL is used as is.
+    """
+    avatar_uri = avatar_uri or (lambda url: url)
+    rows = "".join(
+        f"<tr>"
+        f"<td class='rank'>{row['Rank']}</td>"
+        f"<td class='profile-picture'><img src='{avatar_uri(row['Profile Picture'])}'></td>"
+        f"<td class='name'>{escape(str(row['Name']))}</td>"
+        f"<td class='metric'>{row[metric]}</td>"
+        f"</tr>"
+        for _, row in board.iterrows())
+    return (f"<div class='no-page-break' style='margin-top: 5px;'>"
+            f"<table class='custom-table no-page-break'><tbody>{rows}</tbody></table></div>")
+
+
+def benchmark(df, months, comments_df=None, owner=None, repeat=3):
+    """Time each compute step over the given months, cold and from the cache."""
+    timings = []
+    cache = ResultCache()
+    for month in months:
+        filtered = filter_month(df, month)
+        filtered_comments = None if comments_df is None else filter_month(
+            comments_df, month, date_column='Comment Date')
+        views = {**REPORT_VIEWS, **(OWNER_VIEWS if owner else {}),
+                 **(COMMENT_VIEWS if comments_df is not None else {})}
+        for name, compute in views.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                compute(filtered, filtered_comments, owner)
+            timings.append((month, name, (time.perf_counter() - start) / repeat * 1000))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            month_cohorts(retention_matrix(df), month)
+        timings.append((month, "retention", (time.perf_counter() - start) / repeat * 1000))
+    start = time.perf_counter()
+    fingerprints = dataset_fingerprint(df), dataset_fingerprint(comments_df)
+    fingerprint_ms = (time.perf_counter() - start) * 1000
+    cold = warm = 0.0
+    for month in months:
+        start = time.perf_counter()
+        compute_report(df, month, owner, comments_df, *fingerprints, cache=cache)
+        cold += time.perf_counter() - start
+        start = time.perf_counter()
+        compute_report(df, month, owner, comments_df, *fingerprints, cache=cache)
+        warm += time.perf_counter() - start
+    steps = pd.DataFrame(timings, columns=['Month', 'View', 'ms'])
+    return steps, {'fingerprint ms': fingerprint_ms, 'report cold ms': cold * 1000,
+                   'report cached ms': warm * 1000}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skool engagement analytics core.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    bench = commands.add_parser("benchmark", help="Time the compute steps on a posts CSV")
+    bench.add_argument("csv")
+    bench.add_argument("--comments", help="Deep-scrape comments CSV")
+    bench.add_argument("--owner")
+    bench.add_argument("--all-months", action="store_true",
+                       help="Also time every month, not just the whole period")
+    bench.add_argument("--repeat", type=int, default=3)
+    compare = commands.add_parser("compare", help="Compare communities side by side")
+    compare.add_argument("datasets", nargs="+", metavar="PATH[=OWNER]",
+                         help="Posts tables, optionally with the community owner's name")
+    compare.add_argument("--month", default="All")
+    compare.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        sources = []
+        for spec in args.datasets:
+            path, _, owner = spec.partition("=")
+            sources.append((os.path.basename(path).split('.')[0], path, owner or None))
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            comparison = compare_communities(sources, args.month, executor)
+        print(comparison.to_string())
+        print(f"Compared {len(sources)} communities in {time.perf_counter() - start:.1f}s.")
+        return 0
+
+    df = prepare_posts(read_table(args.csv))
+    comments_df = prepare_comments(read_table(args.comments)) if args.comments else None
+    months = ['All'] + (month_options(df) if args.all_months else [])
+    steps, totals = benchmark(df, months, comments_df, args.owner, args.repeat)
+    by_view = steps.groupby('View', sort=False)['ms'].agg(['mean', 'max']).round(2)
+    print(f"{len(df)} posts, {len(months)} month filters")
+    print(by_view.to_string())
+    for name, value in totals.items():
+        print(f"{name}: {value:.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""Local thumbnail cache for member profile pictures.
+
+Leaderboards used to hot-link every avatar from Skool's CDN. Instead, each
+distinct avatar URL is downloaded once, shrunk to a small square PNG with
+Pillow and stored in a content-addressed cache on disk (objects/<sha256>.png,
+with index.json mapping URLs to hashes). Thumbnails are served to the pages
+as inline data URIs, so rendering a leaderboard makes no external image
+requests, and printed or offline reports keep their pictures.
+
+The cache is bounded: once it grows past max_bytes the least recently used
+thumbnails are evicted. The index is saved and the cache evicted once per
+batch of downloads, merging with the index on disk under a file lock, so
+processes sharing the cache (e.g. report workers) keep each other's entries.
+"""
+import base64
+import hashlib
+import json
+import os
+import threading
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: index writes are not locked across processes
+    fcntl = None
+
+DEFAULT_CACHE_DIR = Path(os.getenv(
+    "SKOOL_AVATAR_CACHE", Path(__file__).parent / ".avatar_cache"))
+THUMBNAIL_SIZE = 50  # pixels; twice the 25px the leaderboards display
+DEFAULT_MAX_BYTES = 20 * 1024 * 1024
+DOWNLOAD_TIMEOUT = 10
+
+# Grey circle shown for members without a picture or whose download failed
+PLACEHOLDER_URI = "data:image/svg+xml;base64," + base64.b64encode(
+    b"<svg xmlns='http://www.w3.org/2000/svg' viewBox='0 0 2 2'>"
+    b"<circle cx='1' cy='1' r='1' fill='#888'/></svg>").decode("ascii")
+
+
+class AvatarCache:
+    """Content-addressed on-disk cache of avatar thumbnails."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 size=THUMBNAIL_SIZE):
+        self.cache_dir = Path(cache_dir)
+        self.objects_dir = self.cache_dir / "objects"
+        self.index_file = self.cache_dir / "index.json"
+        self.max_bytes = max_bytes
+        self.size = size
+        self._lock = threading.Lock()
+        self._uris = {}
+        self._failed = set()
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            self._index = json.loads(self.index_file.read_text())
+        except (FileNotFoundError, ValueError):
+            self._index = {}
+
+    def thumbnail_uri(self, url):
+        """Return an inline data URI for an avatar, downloading it if needed."""
+        if not _is_remote(url):
+            return PLACEHOLDER_URI
+        with self._lock:
+            uri = self._uris.get(url)
+        if uri is not None:
+            return uri
+        path = self._object_path(url)
+        if path is None:
+            path = self._download(url)
+            if path is None:
+                return PLACEHOLDER_URI
+            self._save()
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return PLACEHOLDER_URI
+        os.utime(path)  # mark as recently used for eviction
+        uri = "data:image/png;base64," + base64.b64encode(data).decode("ascii")
+        with self._lock:
+            self._uris[url] = uri
+        return uri
+
+    def prefetch(self, urls, max_workers=8):
+        """Download the distinct avatars among urls that are not cached yet."""
+        missing = {url for url in urls
+                   if _is_remote(url) and self._object_path(url) is None
+                   and url not in self._failed}
+        if not missing:
+            return
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            downloaded = list(executor.map(self._download, missing))
+        if any(downloaded):
+            self._save()
+
+    def _object_path(self, url):
+        with self._lock:
+            digest = self._index.get(url)
+        if digest is None:
+            return None
+        path = self.objects_dir / f"{digest}.png"
+        return path if path.exists() else None
+
+    def _download(self, url):
+        from PIL import Image, ImageOps
+
+        if url in self._failed:
+            return None
+        try:
+            request = urllib.request.Request(
+                url, headers={"User-Agent": "Mozilla/5.0"})
+            with urllib.request.urlopen(request, timeout=DOWNLOAD_TIMEOUT) as response:
+                image = Image.open(BytesIO(response.read()))
+                image = ImageOps.fit(image.convert("RGBA"), (self.size, self.size))
+            buffer = BytesIO()
+            image.save(buffer, format="PNG", optimize=True)
+        except Exception as e:
+            print(f"Could not cache avatar {url}: {e}")
+            with self._lock:
+                self._failed.add(url)
+            return None
+
+        data = buffer.getvalue()
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.objects_dir / f"{digest}.png"
+        if not path.exists():
+            tmp_path = path.with_suffix(f".{threading.get_ident()}.tmp")
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._index[url] = digest
+        return path
+
+    def _save(self):
+        """Merge the index with the one on disk, evict and write it back."""
+        with _file_lock(self.cache_dir / "index.lock"):
+            try:
+                index = json.loads(self.index_file.read_text())
+            except (FileNotFoundError, ValueError):
+                index = {}
+            with self._lock:
+                index.update(self._index)
+            kept = self._evict()
+            with self._lock:
+                # Drops our entries and those of other processes whose
+                # thumbnails are gone
+                self._index = {url: digest for url, digest in index.items()
+                               if digest in kept}
+                self._uris = {url: uri for url, uri in self._uris.items()
+                              if url in self._index}
+                tmp_file = self.index_file.with_suffix(f".{os.getpid()}.tmp")
+                tmp_file.write_text(json.dumps(self._index))
+                os.replace(tmp_file, self.index_file)
+
+    def _evict(self):
+        """Drop least recently used thumbnails until the cache fits max_bytes.
+
+        Returns the digests of the thumbnails left in the cache.
+        """
+        objects = []
+        for path in self.objects_dir.glob("*.png"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            objects.append((stat.st_mtime, stat.st_size, path))
+        kept = {path.stem for _, _, path in objects}
+        total = sum(size for _, size, _ in objects)
+        for _, size, path in sorted(objects):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            kept.discard(path.stem)
+            total -= size
+        return kept
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _is_remote(url):
+    return isinstance(url, str) and url.startswith(("http://", "https://"))
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def avatar_cache():
+    """Return the process-wide avatar cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AvatarCache()
+        return _default_cache
@@ -1,274 +1,210 @@
-import plotly.express as px
+import os
+
 import pandas as pd
 import streamlit as st
-import plotly.graph_objects as go
-import openpyxl
-from datetime import datetime, timedelta
-from skool_community_posts import scrape_community_data
-from io import BytesIO
-import os
-from PIL import Image
-import matplotlib.pyplot as plt
+
+import skool_analytics as analytics
+from skool_avatar_cache import avatar_cache
+from skool_community_posts import add_post_ids
+from skool_post_comments import load_comments
+from skool_scrape_jobs import ScrapeJobManager
+from skool_snapshot_store import SnapshotStore
+from skool_text_index import TextIndex
+
+
+@st.cache_resource
+def get_scrape_job_manager():
+    """One job manager per server process, shared by all sessions."""
+    return ScrapeJobManager()
+
+
+def file_fingerprint(path):
+    """Identifies a saved CSV for the analytics result cache."""
+    return f"{os.path.abspath(path)}:{os.path.getmtime(path)}" if os.path.exists(path) else None
+
+
+@st.cache_data(max_entries=4, show_spinner=False)
+def load_posts(path, fingerprint):
+    """Read and prepare a saved posts CSV once per version of the file."""
+    return analytics.prepare_posts(pd.read_csv(path))
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_text_index(path, fingerprint, _posts):
+    """The text index saved next to a posts CSV, brought up to date once per version."""
+    return TextIndex.for_dataset(path, _posts)
+
+
+scrape_jobs = get_scrape_job_manager()
 
 # Input fields for scraping new data
 st.sidebar.subheader("Scrape New Community Data")
 community_url = st.sidebar.text_input("Enter Community URL:")
 community_owner = st.sidebar.text_input(
     "Enter Community Owner Name:", key='community_owner')
+deep_scrape = st.sidebar.checkbox(
+    "Deep scrape comments",
+    help="Also visit every post to record who commented. Much slower.")
 
-# Updated to work with BytesIO data returned from scraper
+# Scrapes run on a background thread; the job id is kept in the URL so the
+# page re-attaches to it after a reconnect or reload
 if st.sidebar.button("Scrape Data"):
     if community_url and community_owner:
-        with st.spinner("Scraping data, please wait..."):
-            scraped_data = scrape_community_data(
-                community_url, community_owner)
-            if scraped_data:
-                df = pd.read_csv(scraped_data)
-                st.success("Data scraping completed successfully.")
-            else:
-                st.error("Data scraping failed or no data was collected.")
-                df = None
+        job = scrape_jobs.start(community_url, community_owner, deep_scrape)
+        st.query_params["scrape_job"] = job.job_id
     else:
         st.error("Please enter both Community URL and Community Owner Name.")
+
+known_jobs = [job.job_id for job in scrape_jobs.jobs()]
+if known_jobs:
+    current_job_id = st.query_params.get("scrape_job")
+    attached_job_id = st.sidebar.selectbox(
+        "Scrape Jobs", options=[None] + known_jobs,
+        index=known_jobs.index(current_job_id) + 1 if current_job_id in known_jobs else 0,
+        format_func=lambda job_id: "Saved data" if job_id is None else job_id)
+    if attached_job_id is None:
+        st.query_params.pop("scrape_job", None)
+    else:
+        st.query_params["scrape_job"] = attached_job_id
+else:
+    attached_job_id = None
+
+scrape_job = scrape_jobs.get(attached_job_id) if attached_job_id else None
+
+# Comment threads are only available when the data came from a deep scrape
+comments_file = scrape_job.comments_file if scrape_job else "community_post_comments.csv"
+comments_fingerprint = file_fingerprint(comments_file) if comments_file else None
+comments_df = load_comments(comments_file)
+
+
+@st.fragment(run_every=3)
+def scrape_job_progress(job, pages_seen):
+    """Poll a running job and rerun the page when new posts have arrived."""
+    if job.running:
+        if job.details_total:
+            st.info(f"Scraping comments of {job.community_url}: "
+                    f"{job.details_done} of {job.details_total} posts...")
+        else:
+            st.info(f"Scraping {job.community_url}: {job.pages_done} pages, "
+                    f"{job.posts_collected} posts collected so far...")
+        if job.pages_done != pages_seen:
+            st.rerun()
+    else:
+        st.rerun()
+
+
+if scrape_job is not None:
+    if not community_owner:
+        community_owner = scrape_job.community_owner
+    if scrape_job.running:
+        scrape_job_progress(scrape_job, scrape_job.pages_done)
+        df = scrape_job.partial_frame()
+        if df is None:
+            st.stop()
+        df = analytics.prepare_posts(df)
+        dataset_key = None  # fingerprinted from the data as it grows
+        dataset_path = None
+    elif scrape_job.status == "finished":
+        dataset_path = scrape_job.output_file
+        dataset_key = file_fingerprint(dataset_path)
+        df = load_posts(scrape_job.output_file, dataset_key)
+        st.success("Data scraping completed successfully.")
+    else:
+        st.error(f"Data scraping failed or no data was collected: {scrape_job.error}")
         df = None
 else:
     # Load data from CSV file
-    try:
-        df = pd.read_csv("community_posts.csv")
-    except FileNotFoundError:
+    dataset_path = "community_posts.csv"
+    dataset_key = file_fingerprint(dataset_path)
+    if dataset_key is None:
         st.error(
             "CSV file not found. Please ensure the scraping script has run successfully."
         )
         df = None
+    else:
+        try:
+            df = load_posts("community_posts.csv", dataset_key)
+        except Exception as e:
+            st.error(f"Error reading CSV file: {e}")
+            df = None
 
-# Only proceed if df is defined
-if df is not None:
-    # Convert Post Date to datetime
-    try:
-        df['Post Date'] = pd.to_datetime(df['Post Date'], format="%d/%m/%Y")
-    except Exception as e:
-        st.error(f"Error converting Post Date: {e}")
-else:
+if df is None:
     st.stop()  # Stop execution if no valid data is available
 
+if comments_df.empty:
+    comments_df = None
+else:
+    comments_df = analytics.prepare_comments(comments_df)
 
-# Convert Post Date to datetime
-try:
-    df['Post Date'] = pd.to_datetime(df['Post Date'], format="%d/%m/%Y")
-except Exception as e:
-    st.error(f"Error converting Post Date: {e}")
-    exit()
-
-st.markdown("""
-    <style>
-        h1 {
-            margin-bottom: 10px !important;  /* Reduce space below the main title */
-        }
-        h3 {
-            margin-top: 0px !important;      /* Reduce space above subheadings */
-        }
-    </style>
-""", unsafe_allow_html=True)
-
+st.markdown(analytics.DASHBOARD_CSS, unsafe_allow_html=True)
 
 # Streamlit App
 st.markdown("<h1 style='text-align: center; margin-bottom: -10px;'>Skool Community Analysis Dashboard</h1>",
             unsafe_allow_html=True)
 
-
-# Custom CSS for page formatting and preventing page breaks
-st.markdown("""
-    <style>
-        @media print {
-            h1, h2, h3, h4, h5, h6, p, div, table, thead, tbody, tfoot, tr, th, td {
-                page-break-inside: avoid;
-            }
-            .page-break {
-                page-break-before: always;
-            }
-            .chart-container {
-                page-break-inside: avoid;
-                page-break-before: auto;
-                page-break-after: auto;
-                margin-bottom: 20px;
-            }
-            body {
-                -webkit-print-color-adjust: exact;
-                font-size: 16px;
-            }
-        }
-        .leaderboard-header {
-            margin-bottom: -100px;  /* Reduces space below the header */
-            margin-top: -10px;   /* Reduces space above the header */
-        }
-        .leaderboard-table {
-            margin-top: -100px;   /* Brings the table closer to the header */
-        }
-    </style>
-""", unsafe_allow_html=True)
-
 # Month Filter
-month_filter = st.sidebar.selectbox("Select Month", options=[
-                                    'All'] + df['Post Date'].dt.strftime('%B %Y').unique().tolist())
-if month_filter != 'All':
-    df = df[df['Post Date'].dt.strftime('%B %Y') == month_filter]
+month_filter = st.sidebar.selectbox(
+    "Select Month", options=['All'] + analytics.month_options(df))
 
+# Every view comes from the analytics core in one batch, cached across
+# reruns and sessions by the fingerprint of the data
+report = analytics.compute_report(
+    df, month_filter, community_owner, comments_df,
+    fingerprint=dataset_key, comments_fingerprint=comments_fingerprint)
 
-# Posts by Week
 
-def posts_by_time_period(df):
-    df['Week'] = df['Post Date'].dt.isocalendar().week
-    df['Year'] = df['Post Date'].dt.year
-    weekly_posts = df.groupby(
-        ['Year', 'Week', 'Category']).size().reset_index(name='Counts')
-    weekly_posts['Week_Start_Date'] = weekly_posts.apply(
-        lambda row: datetime.strptime(f'{row.Year}-W{row.Week}-1', "%Y-W%W-%w"), axis=1)
+# Posts by Week
 
-    st.markdown("<h3 style='text-align: center;'>Posts by Week</h3>",
+def posts_by_time_period(report):
+    bucket, counts = report['posts_by_week']
+    st.markdown(f"<h3 style='text-align: center;'>Posts by {analytics.BUCKET_LABELS[bucket]}</h3>",
                 unsafe_allow_html=True)
 
-    # Create a pivot table for stacked bar chart
-    weekly_pivot = weekly_posts.pivot(
-        index=['Year', 'Week', 'Week_Start_Date'], columns='Category', values='Counts').fillna(0)
-    weekly_pivot.reset_index(inplace=True)
-
-    # Create Plotly figure for stacked bar chart
-    fig = go.Figure()
-    color_sequence = px.colors.qualitative.Plotly
-    for i, category in enumerate(weekly_pivot.columns[3:]):
-        fig.add_trace(go.Bar(
-            x=weekly_pivot['Week'],
-            y=weekly_pivot[category],
-            name=category,
-            marker_color=color_sequence[i % len(color_sequence)],
-            hovertext=weekly_pivot.apply(
-                lambda row: f"w/c {row['Week_Start_Date'].strftime('%d %b %Y')}, {int(row[category])}", axis=1),
-            hoverinfo='text'
-        ))
-
-    # Update layout for better readability
-    fig.update_layout(
-        xaxis=dict(
-            title="Week",
-            tickfont=dict(size=16)
-        ),
-        yaxis=dict(
-            title="Number of Posts",
-            titlefont=dict(size=16),
-            tickfont=dict(size=16),
-        ),
-        barmode='stack',
-        template="plotly_dark",
-        margin=dict(t=50, b=50),
-        height=400
-    )
-
     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-    st.plotly_chart(fig)
+    st.plotly_chart(analytics.posts_over_time_figure(bucket, counts))
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Top Performing Posts
 
 
-def top_performing_posts(df):
-    df['Total Engagement'] = df['Likes'].astype(
-        int) + df['Comments'].astype(int)
-    top_posts = df.sort_values(by='Total Engagement', ascending=False).head(10)
+def top_performing_posts(report):
     st.markdown("<div class='page-break'><h2 style='text-align: center;'>Top Performing Posts</h2></div>",
                 unsafe_allow_html=True)
 
     # Top 5 Performing Posts by Total Engagement
-    top_5_posts = top_posts.head(5)
     st.markdown("<h3 style='text-align: center;'>Top 5 Performing Posts by Total Engagement</h3>",
                 unsafe_allow_html=True)
-    st.table(top_5_posts[['Name', 'Title', 'Likes',
-             'Comments', 'Total Engagement']])
+    st.table(report['top_posts'])
 
     # Top 5 Performing Posts by Total Engagement (Excluding Community Owner)
-    top_posts_excluding_owner = df[df['Name'] != community_owner].sort_values(
-        by='Total Engagement', ascending=False).head(10)
-    top_5_posts_excluding_owner = top_posts_excluding_owner.head(5)
-    st.markdown("<h3 style='text-align: center;'>Top 5 Performing Posts by Total Engagement (Excluding Community Owner)</h3>",
-                unsafe_allow_html=True)
-    st.table(top_5_posts_excluding_owner[[
-             'Name', 'Title', 'Likes', 'Comments', 'Total Engagement']])
+    if 'top_posts_excluding_owner' in report:
+        st.markdown("<h3 style='text-align: center;'>Top 5 Performing Posts by Total Engagement (Excluding Community Owner)</h3>",
+                    unsafe_allow_html=True)
+        st.table(report['top_posts_excluding_owner'])
 
 # Posts by Category
 
 
-def posts_by_category(df):
-    category_count = df['Category'].value_counts(
-    ).sort_values(ascending=False).reset_index()
-    category_count.columns = ['Category', 'Count']
-
+def posts_by_category(report):
     st.markdown("<div class='chart-container'><h3 style='text-align: center;'>Posts by Category</h3></div>",
                 unsafe_allow_html=True)
 
-    # Use Plotly to create a bar chart with customization and emoji support
-    fig = px.bar(category_count, x='Category', y='Count', text='Count',
-                 color='Category', color_discrete_sequence=px.colors.qualitative.Plotly)
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        yaxis_title="Number of Posts",
-        xaxis_title="Categories",
-        template="plotly_dark",
-        font=dict(size=16),
-        margin=dict(t=50, b=100)
-    )
-    fig.update_traces(texttemplate='%{text}', textposition='outside')
-
     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-    st.plotly_chart(fig)
+    st.plotly_chart(analytics.category_figure(report['categories']))
     st.markdown("</div>", unsafe_allow_html=True)
 
 
 # Users Engagement Leaderboard
 
-def users_engagement_leaderboard(df, metric='Posts'):
-    if metric == "Posts":
-        leaderboard = df['Name'].value_counts().reset_index()
-        leaderboard.columns = ['Name', 'Posts']
-    elif metric == "Likes":
-        leaderboard = df.groupby('Name')['Likes'].sum(
-        ).sort_values(ascending=False).reset_index()
-    elif metric == "Comments":
-        leaderboard = df.groupby('Name')['Comments'].sum(
-        ).sort_values(ascending=False).reset_index()
-    elif metric == "Total Engagement":
-        df['Total Engagement'] = df['Likes'].astype(
-            int) + df['Comments'].astype(int)
-        leaderboard = df.groupby('Name')['Total Engagement'].sum(
-        ).sort_values(ascending=False).reset_index()
-
-    leaderboard = leaderboard.merge(
-        df[['Name', 'Profile Picture']].drop_duplicates(), on='Name', how='left').head(20)
-    leaderboard.reset_index(drop=True, inplace=True)
-    leaderboard.insert(0, 'Rank', leaderboard.index + 1)
-
-    # Display leaderboard in the same format as previously with profile pictures
-    st.write("<style>"
-             "table {width: 100%; border-collapse: collapse;}"
-             "th, td {border: 1px solid #ddd; padding: 12px; text-align: center; font-size: 16px;}"
-             "th {background-color: #444; color: white; height: 40px; text-align: center;}"
-             "td img {width: 25px; height: 25px; border-radius: 50%;}"
-             "th.rank, td.rank {width: 60px;}"
-             "th.profile-picture, td.profile-picture {width: 60px;}"
-             "th.name, td.name {width: 200px;}"
-             "th.metric, td.metric {width: 50px;}"
-             "caption {font-size: 2em; margin-bottom: 10px; font-weight: bold; text-align: center;}"
-             "</style>", unsafe_allow_html=True)
-    st.write("<div class='no-page-break' style='margin-top: 10px;'><table class='custom-table no-page-break'>",
+def users_engagement_leaderboard(report, metric='Posts'):
+    leaderboard = report[f"leaderboard:{metric}"]
+
+    # Avatars are inlined from the local thumbnail cache instead of hot-linked
+    avatars = avatar_cache()
+    avatars.prefetch(leaderboard['Profile Picture'])
+    st.write(analytics.LEADERBOARD_CSS, unsafe_allow_html=True)
+    st.write(analytics.leaderboard_html(leaderboard, metric, avatars.thumbnail_uri),
              unsafe_allow_html=True)
-    st.write("<tbody>", unsafe_allow_html=True)
-    for _, row in leaderboard.iterrows():
-        st.write(f"<tr>"
-                 f"<td class='rank'>{row['Rank']}</td>"
-                 f"<td class='profile-picture'><img src='{
-                     row['Profile Picture']}'></td>"
-                 f"<td class='name'>{row['Name']}</td>"
-                 f"<td class='metric'>{row[metric]}</td>"
-                 f"</tr>", unsafe_allow_html=True)
-    st.write("</tbody></table></div>", unsafe_allow_html=True)
 
 # Run Analysis in Streamlit
 
@@ -277,13 +213,13 @@ st.markdown("<div class='full-page'>", unsafe_allow_html=True)
 
 # Charts and Headers - Page 1
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-posts_by_time_period(df)
-posts_by_category(df)
+posts_by_time_period(report)
+posts_by_category(report)
 st.markdown("</div>", unsafe_allow_html=True)
 
 # Top Performing Posts - Page 2
 st.markdown("<div class='page-break full-page'>", unsafe_allow_html=True)
-top_performing_posts(df)
+top_performing_posts(report)
 st.markdown("</div>", unsafe_allow_html=True)
 
 # User Engagement Leaderboards - Page 3 and Page 4
@@ -301,7 +237,7 @@ with col1:
                 unsafe_allow_html=True)
     st.markdown("<div class='leaderboard-table no-page-break'>",
                 unsafe_allow_html=True)
-    users_engagement_leaderboard(df, metric='Posts')
+    users_engagement_leaderboard(report, metric='Posts')
     st.markdown("</div>", unsafe_allow_html=True)
 
 with col2:
@@ -309,7 +245,7 @@ with col2:
                 unsafe_allow_html=True)
     st.markdown("<div class='leaderboard-table no-page-break'>",
                 unsafe_allow_html=True)
-    users_engagement_leaderboard(df, metric='Likes')
+    users_engagement_leaderboard(report, metric='Likes')
     st.markdown("</div>", unsafe_allow_html=True)
 
 # Comments and Total Engagement leaderboards side by side - Page 4
@@ -326,7 +262,7 @@ with col3:
                 unsafe_allow_html=True)
     st.markdown("<div class='leaderboard-table no-page-break'>",
                 unsafe_allow_html=True)
-    users_engagement_leaderboard(df, metric='Comments')
+    users_engagement_leaderboard(report, metric='Comments')
     st.markdown("</div>", unsafe_allow_html=True)
 
 with col4:
@@ -334,9 +270,63 @@ with col4:
                 unsafe_allow_html=True)
     st.markdown("<div class='leaderboard-table no-page-break'>",
                 unsafe_allow_html=True)
-    users_engagement_leaderboard(df, metric='Total Engagement')
+    users_engagement_leaderboard(report, metric='Total Engagement')
     st.markdown("</div>", unsafe_allow_html=True)
 
 st.markdown("</div>", unsafe_allow_html=True)
 
+# Members ranked by the comments they gave, available after a deep scrape
+if 'leaderboard:Comments Given' in report:
+    st.markdown("<div class='page-break full-page'>",
+                unsafe_allow_html=True)
+    st.markdown("<h2 style='text-align: center; margin-bottom: 5px;'>User Engagement Leaderboard</h2>",
+                unsafe_allow_html=True)
+    st.markdown("<h4 class='leaderboard-header' style='text-align: center;'>Comments Given</h4>",
+                unsafe_allow_html=True)
+    st.markdown("<div class='leaderboard-table no-page-break'>", unsafe_allow_html=True)
+    users_engagement_leaderboard(report, metric='Comments Given')
+    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+# Keyword search over the saved scrape, using the index stored next to it
+@st.fragment
+def keyword_search(index, posts):
+    st.markdown("<div class='page-break full-page'><h2 style='text-align: center;'>Keyword Search</h2></div>",
+                unsafe_allow_html=True)
+    query = st.text_input("Search Posts:", key="keyword_search",
+                          help="Finds posts whose title or description contains every word.")
+    if not query:
+        return
+    matches = posts[posts['Post ID'].isin(index.search(query))].sort_values(
+        'Total Engagement', ascending=False)
+    st.write(f"{len(matches)} matching posts.")
+    st.dataframe(matches[['Name', 'Post Date', 'Title', 'Likes', 'Comments',
+                          'Total Engagement']], hide_index=True)
+
+
+if dataset_path is not None:
+    text_index = load_text_index(dataset_path, dataset_key, df)
+    keyword_search(text_index, add_post_ids(analytics.filter_month(df, month_filter).copy()))
+
+# Engagement velocity from the snapshots of repeated scrapes of this community
+velocity_community = scrape_job.job_id if scrape_job else st.query_params.get("community")
+if velocity_community:
+    velocity_hours = st.sidebar.selectbox(
+        "Velocity Window", options=[24, 24 * 7],
+        format_func=lambda hours: "Last 24 hours" if hours == 24 else "Last 7 days")
+    snapshots = SnapshotStore()
+    member_velocity = snapshots.engagement_velocity(
+        velocity_community, velocity_hours, by="member")
+    if not member_velocity.empty:
+        post_velocity = snapshots.engagement_velocity(
+            velocity_community, velocity_hours, by="post")
+        st.markdown("<div class='page-break full-page'><h2 style='text-align: center;'>Engagement Velocity</h2></div>",
+                    unsafe_allow_html=True)
+        st.markdown("<h3 style='text-align: center;'>Fastest Growing Posts</h3>",
+                    unsafe_allow_html=True)
+        st.table(post_velocity.drop(columns='Post ID').head(10))
+        st.markdown("<h3 style='text-align: center;'>Members Gaining the Most Engagement</h3>",
+                    unsafe_allow_html=True)
+        st.table(member_velocity.head(10))
+
 st.markdown("</div>", unsafe_allow_html=True)
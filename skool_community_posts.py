@@ -1,21 +1,30 @@
 import time
 import pandas as pd
 import os
-from dotenv import load_dotenv
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
 from datetime import datetime, timedelta
 from pathlib import Path
 import re
+import hashlib
+
+# The Selenium stack (selenium, webdriver_manager, dotenv) is imported inside
+# the functions that drive the browser so that importing this module, e.g. for
+# convert_post_time_to_date, does not pay for it.
+
+# Overridable so the scraper can be pointed at a local stand-in site
+SKOOL_BASE_URL = os.getenv("SKOOL_BASE_URL", "https://www.skool.com").rstrip("/")
 
 
 def login_and_get_driver():
     """Login to Skool and retrieve necessary cookies."""
+    from dotenv import load_dotenv
+    from selenium import webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.chrome.service import Service
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from webdriver_manager.chrome import ChromeDriverManager
+    from selenium.common.exceptions import TimeoutException
+
     # Load environment variables
     env_path = Path(__file__).parent / ".env"
     load_dotenv(dotenv_path=env_path)
@@ -41,7 +50,7 @@ def login_and_get_driver():
 
         print("WebDriver initiated.")
 
-        driver.get("https://www.skool.com/login")
+        driver.get(f"{SKOOL_BASE_URL}/login")
 
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.ID, "email")))
@@ -106,8 +115,52 @@ def remove_duplicates(dataframe):
         subset=["Title", "Post Date", "Category"], keep='first', inplace=True)
 
 
-def scrape_community_posts(driver, community_url):
-    """Scrape all posts from a given Skool community."""
+def post_identity(name, title, post_date, category, post_url="N/A"):
+    """Return a stable identifier for a post.
+
+    The post URL is used when the scrape captured it; older exports without
+    URLs fall back to a hash of the author, title, post date and category,
+    so recurring posts with the same title stay apart as in
+    remove_duplicates.
+    """
+    if isinstance(post_url, str) and post_url not in ("", "N/A"):
+        return re.sub(r'^https?://[^/]+', '', post_url).split('?')[0]
+    if hasattr(post_date, "strftime"):
+        # Prepared tables hold parsed dates; hash them as scraped
+        post_date = post_date.strftime("%d/%m/%Y")
+    key = "\x1f".join(str(part) for part in (name, title, post_date, category))
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+def add_post_ids(dataframe):
+    """Add a Post ID column to a posts DataFrame that does not have one."""
+    if "Post ID" not in dataframe.columns:
+        post_urls = dataframe.get(
+            "Post URL", pd.Series("N/A", index=dataframe.index))
+        dataframe["Post ID"] = [
+            post_identity(*post) for post in zip(
+                dataframe["Name"], dataframe["Title"], dataframe["Post Date"],
+                dataframe["Category"], post_urls)]
+    return dataframe
+
+
+def community_identifier_from_url(community_url):
+    """Derive the identifier used in output file names from a community URL."""
+    return re.sub(
+        r'^https?://[^/]+/', '', community_url).replace('/', '_')
+
+
+def scrape_community_posts(driver, community_url, progress=None):
+    """Scrape all posts from a given Skool community.
+
+    If given, progress(pages_done, posts_data) is called after every page so
+    callers can follow the scrape and use the posts collected so far.
+    """
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import NoSuchElementException
+
     posts_data = []
     try:
         # Navigate to the community page
@@ -115,6 +168,7 @@ def scrape_community_posts(driver, community_url):
         WebDriverWait(driver, 20).until(
             EC.presence_of_element_located((By.CLASS_NAME, "styled__PostItemWrapper-sc-e4ns84-7")))
 
+        pages_done = 0
         while True:
             # Extract post elements
             post_elements = driver.find_elements(
@@ -165,6 +219,14 @@ def scrape_community_posts(driver, community_url):
                     )
                     title = title_element.text if title_element else "N/A"
 
+                    # The title links to the post's detail view
+                    try:
+                        post_url = title_element.find_element(
+                            By.XPATH, "./ancestor::a[1]"
+                        ).get_attribute("href") or "N/A"
+                    except NoSuchElementException:
+                        post_url = "N/A"
+
                     description_element = post.find_element(
                         By.XPATH, ".//div[contains(@class, 'ContentPreviewWrapper')]"
                     )
@@ -192,15 +254,22 @@ def scrape_community_posts(driver, community_url):
                         "Description": description,
                         "Likes": likes,
                         "Comments": comments,
-                        "Date Scraped": date_scraped
+                        "Date Scraped": date_scraped,
+                        "Post URL": post_url,
+                        "Post ID": post_identity(
+                            name, title, post_date, category, post_url)
                     })
                 except NoSuchElementException as e:
                     print(f"An element was not found: {e}")
 
+            pages_done += 1
+            if progress is not None:
+                progress(pages_done, posts_data)
+
             # Step 3: Track the number of posts before clicking the next button
             previous_post_count = len(posts_data)
-            print(f"Number of posts before clicking next: {
-                  previous_post_count}")
+            print(
+                f"Number of posts before clicking next: {previous_post_count}")
 
             # Step 2: Check if there is a next page button and click it, or scroll down to load more
             try:
@@ -240,8 +309,7 @@ def scrape_community_posts(driver, community_url):
             remove_duplicates(df)  # Remove duplicates from the DataFrame
 
             # Extract community identifier from the URL
-            community_identifier = re.sub(
-                r'https://www\.skool\.com/', '', community_url).replace('/', '_')
+            community_identifier = community_identifier_from_url(community_url)
             output_file = f"scraped_community_posts_{community_identifier}.csv"
 
             # Save DataFrame to CSV file
@@ -253,11 +321,61 @@ def scrape_community_posts(driver, community_url):
             return None
 
 
-def scrape_community_data(community_url, community_owner):
+def _post_process_scrape(scraped_data, posts, community_identifier):
+    """Record, index and cache a saved scrape.
+
+    Each step is best-effort: the CSV is already written, so a failure here is
+    reported and the scrape still succeeds.
+    """
+    def snapshot():
+        # Keep the like/comment counts of every scrape for growth analytics
+        from skool_snapshot_store import SnapshotStore
+        SnapshotStore().record_scrape(community_identifier, posts)
+
+    def text_index():
+        # Tokenise the new posts into the full-text index next to the CSV
+        from skool_text_index import TextIndex
+        TextIndex.for_dataset(scraped_data, posts)
+
+    def avatars():
+        # Download each distinct avatar once so reports never hot-link them
+        from skool_avatar_cache import avatar_cache
+        avatar_cache().prefetch(posts["Profile Picture"].dropna().unique())
+
+    for step, run in (("record the engagement snapshot", snapshot),
+                      ("update the text index", text_index),
+                      ("prefetch avatars", avatars)):
+        try:
+            run()
+        except Exception as e:
+            print(f"Could not {step} for {scraped_data}: {e}")
+
+
+def scrape_community_data(community_url, community_owner, progress=None,
+                          deep_scrape=False, detail_progress=None):
+    """Scrape a community's feed and optionally its post comment threads.
+
+    Every scrape is also appended to the engagement snapshot store. With
+    deep_scrape, each post's detail view is visited afterwards (see
+    skool_post_comments) and the commenters are saved to a second CSV.
+    """
     driver = login_and_get_driver()
     if driver:
-        scraped_data = scrape_community_posts(driver, community_url)
-        driver.quit()
+        try:
+            scraped_data = scrape_community_posts(
+                driver, community_url, progress=progress)
+            if scraped_data:
+                posts = pd.read_csv(scraped_data)
+                community_identifier = community_identifier_from_url(community_url)
+                _post_process_scrape(scraped_data, posts, community_identifier)
+
+                if deep_scrape:
+                    from skool_post_comments import deep_scrape_comments
+                    deep_scrape_comments(
+                        posts, community_identifier,
+                        drivers=[driver], progress=detail_progress)
+        finally:
+            driver.quit()
         return scraped_data
     else:
         return None
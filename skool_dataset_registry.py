@@ -0,0 +1,123 @@
+"""Process-wide registry of prepared datasets shared by dashboard sessions.
+
+Every Streamlit session used to parse its own copy of the same upload, so
+memory and CPU grew with the number of viewers. The registry keeps each
+prepared dataset once per process, keyed by its content fingerprint, and
+maps community identifiers (the dashboard's `community` query parameter) to
+the latest dataset published for them, so other sessions can open it
+without uploading the file again.
+
+Datasets and the per-dataset aggregates built on them (e.g. the member and
+text indexes) are shared read-only. Sessions hold references to the datasets
+they display; once the registry grows past its memory budget, datasets that
+no live session references are evicted, least recently used first.
+"""
+import os
+import sys
+import threading
+import time
+
+import pandas as pd
+
+DEFAULT_MAX_BYTES = int(os.getenv("SKOOL_DATASET_BUDGET_MB", "1024")) * 1024 * 1024
+
+
+def estimate_nbytes(obj):
+    """Approximate memory held by a dataset or aggregate."""
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    if hasattr(obj, "nbytes"):
+        return int(obj.nbytes)
+    return sys.getsizeof(obj)
+
+
+class SharedDataset:
+    """A prepared dataset and its memoised aggregates."""
+
+    def __init__(self, key, data):
+        self.key = key
+        self.data = data
+        self.nbytes = estimate_nbytes(data)
+        self.last_used = time.monotonic()
+        self.holders = set()
+        self._aggregates = {}
+        self._lock = threading.Lock()
+
+    def aggregate(self, name, compute):
+        """Return the aggregate called name, computing it once per dataset."""
+        with self._lock:
+            if name not in self._aggregates:
+                value = compute(self.data)
+                self._aggregates[name] = value
+                self.nbytes += estimate_nbytes(value)
+            return self._aggregates[name]
+
+
+class DatasetRegistry:
+    """Shared datasets with reference counting, a memory budget and LRU eviction."""
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, is_alive=None):
+        """is_alive(holder) tells whether a holder (e.g. a session id) still
+        exists; references of holders that are gone are dropped on eviction."""
+        self.max_bytes = max_bytes
+        self.is_alive = is_alive
+        self._datasets = {}
+        self._identifiers = {}
+        self._lock = threading.Lock()
+
+    def open(self, key, loader, holder, identifier=None):
+        """Return the dataset with content key, loading it if needed.
+
+        The holder gets a reference to it, and identifier (if given) is
+        pointed at it for open_identifier.
+        """
+        with self._lock:
+            dataset = self._datasets.get(key)
+        if dataset is None:
+            # Load outside the lock; if two sessions race, the first one wins
+            loaded = SharedDataset(key, loader())
+            with self._lock:
+                dataset = self._datasets.setdefault(key, loaded)
+        with self._lock:
+            self._hold(dataset, holder)
+            if identifier is not None:
+                self._identifiers[identifier] = key
+            self._evict()
+        return dataset
+
+    def open_identifier(self, identifier, holder):
+        """The dataset last published under identifier, or None."""
+        with self._lock:
+            dataset = self._datasets.get(self._identifiers.get(identifier))
+            if dataset is not None:
+                self._hold(dataset, holder)
+            return dataset
+
+    def release(self, key, holder):
+        with self._lock:
+            dataset = self._datasets.get(key)
+            if dataset is not None:
+                dataset.holders.discard(holder)
+                self._evict()
+
+    def _hold(self, dataset, holder):
+        dataset.holders.add(holder)
+        dataset.last_used = time.monotonic()
+
+    def _evict(self):
+        total = sum(dataset.nbytes for dataset in self._datasets.values())
+        if total <= self.max_bytes:
+            return
+        if self.is_alive is not None:
+            for dataset in self._datasets.values():
+                dataset.holders = {h for h in dataset.holders if self.is_alive(h)}
+        idle = sorted((dataset for dataset in self._datasets.values() if not dataset.holders),
+                      key=lambda dataset: dataset.last_used)
+        for dataset in idle:
+            if total <= self.max_bytes:
+                break
+            del self._datasets[dataset.key]
+            total -= dataset.nbytes
+        self._identifiers = {identifier: key for identifier, key in self._identifiers.items()
+                             if key in self._datasets}
+
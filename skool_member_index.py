@@ -0,0 +1,161 @@
+"""Per-member index over a prepared posts table.
+
+The posts are sorted once by member and post date, so each member's posts
+are one contiguous row range found by binary search over the sorted names.
+Profile stats are precomputed for every member at build time, and member
+search is a prefix lookup over the sorted, lower-cased names, so looking up
+any member stays instant with 100k members.
+
+One index covers the whole dataset. A month filter is applied per lookup:
+each member's post count per month is kept as a sorted array of
+(member, month) keys, and profiles and post histories for a month are
+computed from the member's own rows.
+"""
+import numpy as np
+import pandas as pd
+
+import skool_analytics as analytics
+
+PROFILE_COLUMNS = ['Posts', 'Likes', 'Comments', 'Avg Engagement',
+                   'First Post', 'Last Post', 'Level', 'Level Changes']
+POST_HISTORY_COLUMNS = ['Post Date', 'Category', 'Title', 'Likes', 'Comments',
+                        'Total Engagement']
+
+
+class MemberIndex:
+    """Name-to-row-range lookups and precomputed stats per member."""
+
+    def __init__(self, df):
+        """df is a posts table prepared with skool_analytics.prepare_posts."""
+        posts = df.assign(Name=df['Name'].astype(str))
+        self.posts = posts.sort_values(['Name', 'Post Date'], kind='stable').reset_index(drop=True)
+        names = self.posts['Name'].to_numpy(dtype=str)
+        self.names, self._starts = np.unique(names, return_index=True)
+        self._ends = np.append(self._starts[1:], len(names))
+
+        # Search keys are the lower-cased names in their own sort order
+        keys = np.char.lower(self.names)
+        self._key_order = np.argsort(keys, kind='stable')
+        self._keys = keys[self._key_order]
+
+        self.profiles = self._build_profiles(self.posts)
+        self.category_mix = self.posts.groupby(['Name', 'Category']).size().unstack(fill_value=0)
+
+        # Posts per (member, month), keyed member * n_months + month so a
+        # member's count in any month is one binary search
+        dates = self.posts['Post Date']
+        months = (dates.dt.year * 12 + dates.dt.month).fillna(0).astype(np.int64).to_numpy()
+        self._month_base = int(months.min()) if len(months) else 0
+        self._n_months = int(months.max()) - self._month_base + 1 if len(months) else 1
+        members = np.repeat(np.arange(len(self.names), dtype=np.int64), self._ends - self._starts)
+        self._month_keys, self._month_counts = np.unique(
+            members * self._n_months + (months - self._month_base), return_counts=True)
+
+    @staticmethod
+    def _build_profiles(posts):
+        by_member = posts.groupby('Name', sort=True)
+        profiles = pd.DataFrame({
+            'Posts': by_member.size(),
+            'Likes': by_member['Likes'].sum(),
+            'Comments': by_member['Comments'].sum(),
+            'Avg Engagement': by_member['Total Engagement'].mean().round(1),
+            'First Post': by_member['Post Date'].min(),
+            'Last Post': by_member['Post Date'].max(),
+        })
+        if 'Level' in posts:
+            # Rows are in date order within a member, so a level that differs
+            # from the previous row of the same member is a level change
+            levels = posts['Level'].astype(str)
+            changed = (levels != levels.shift()) & (posts['Name'] == posts['Name'].shift())
+            profiles['Level'] = by_member['Level'].last()
+            profiles['Level Changes'] = changed.groupby(posts['Name']).sum()
+        else:
+            profiles['Level'] = None
+            profiles['Level Changes'] = 0
+        return profiles[PROFILE_COLUMNS]
+
+    def __len__(self):
+        return len(self.names)
+
+    def _month_key(self, month):
+        """Offset of a 'Month YYYY' filter in the (member, month) keys, or None for 'All'."""
+        if month == 'All':
+            return None
+        start = pd.to_datetime(month, format=analytics.MONTH_FORMAT)
+        return start.year * 12 + start.month - self._month_base
+
+    def _post_counts(self, positions, month):
+        """Posts of the members at positions, in a month or overall."""
+        offset = self._month_key(month)
+        if offset is None:
+            return self._ends[positions] - self._starts[positions]
+        counts = np.zeros(len(positions), dtype=np.int64)
+        if not 0 <= offset < self._n_months:
+            return counts
+        keys = np.asarray(positions, dtype=np.int64) * self._n_months + offset
+        found = np.minimum(np.searchsorted(self._month_keys, keys), len(self._month_keys) - 1)
+        hit = self._month_keys[found] == keys
+        counts[hit] = self._month_counts[found[hit]]
+        return counts
+
+    def member_count(self, month='All'):
+        """Number of members with posts in a month ('All' for every member)."""
+        offset = self._month_key(month)
+        if offset is None:
+            return len(self.names)
+        return int((self._month_keys % self._n_months == offset).sum())
+
+    def _rows(self, name, month):
+        i = self._position(name)
+        if i is None:
+            return self.posts.iloc[0:0]
+        return analytics.filter_month(self.posts.iloc[self._starts[i]:self._ends[i]], month)
+
+    @property
+    def nbytes(self):
+        return int(self.posts.memory_usage(deep=True).sum()
+                   + self.profiles.memory_usage(deep=True).sum()
+                   + self.category_mix.memory_usage().sum()
+                   + self.names.nbytes + self._keys.nbytes
+                   + self._month_keys.nbytes + self._month_counts.nbytes)
+
+    def __contains__(self, name):
+        return self._position(name) is not None
+
+    def _position(self, name):
+        i = np.searchsorted(self.names, name)
+        return i if i < len(self.names) and self.names[i] == name else None
+
+    def search(self, prefix, limit=20, month='All'):
+        """Members whose name starts with prefix (case-insensitive) and who
+        posted in month, most active first."""
+        prefix = prefix.strip().lower()
+        if not prefix:
+            return []
+        lo = np.searchsorted(self._keys, prefix, side='left')
+        hi = np.searchsorted(self._keys, prefix + '\U0010ffff', side='left')
+        positions = self._key_order[lo:hi]
+        if month != 'All':
+            positions = positions[self._post_counts(positions, month) > 0]
+        matches = self.names[positions]
+        if len(matches) > limit:
+            counts = self._post_counts(positions, month)
+            matches = matches[np.argsort(-counts, kind='stable')[:limit]]
+        return matches.tolist()
+
+    def profile(self, name, month='All'):
+        """The stats of one member as a Series, precomputed for 'All'."""
+        if month == 'All':
+            return self.profiles.loc[name]
+        return self._build_profiles(self._rows(name, month)).loc[name]
+
+    def categories(self, name, month='All'):
+        """A member's number of posts per category."""
+        if month == 'All':
+            return self.category_mix.loc[name]
+        return self._rows(name, month)['Category'].value_counts().sort_index()
+
+    def post_history(self, name, month='All'):
+        """A member's posts, most recent first."""
+        rows = self._rows(name, month)
+        return rows[POST_HISTORY_COLUMNS].iloc[::-1].reset_index(drop=True)
@@ -0,0 +1,217 @@
+"""Deep scrape of post comment threads.
+
+The feed only shows aggregate like and comment counts. This stage visits the
+detail view of each post and records who commented, how many replies each
+comment received and when it was posted. Detail pages are fetched
+concurrently by a small pool of logged-in WebDrivers with a per-host rate
+limit, and posts whose comment count has not changed since the previous deep
+scrape are skipped.
+
+The result is saved as scraped_post_comments_<community>.csv with one row per
+comment, keyed by the same Post ID as the posts CSV.
+"""
+import os
+import queue
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from skool_community_posts import add_post_ids, convert_post_time_to_date
+
+COMMENT_COLUMNS = ["Post ID", "Commenter", "Profile Picture", "Comment Date",
+                   "Replies", "Post Comments", "Date Scraped"]
+
+DEFAULT_MAX_WORKERS = 3
+DEFAULT_MIN_INTERVAL = 1.0  # seconds between requests to the same host
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host by at least min_interval seconds.
+
+    With jitter, each gap is stretched by a random fraction of up to jitter
+    so that requests do not arrive on a fixed beat.
+    """
+
+    def __init__(self, min_interval=DEFAULT_MIN_INTERVAL, jitter=0.0):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval * (
+                1 + random.uniform(0, self.jitter))
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def comments_output_file(community_identifier):
+    """Path of the comments CSV that accompanies a community's posts CSV."""
+    return f"scraped_post_comments_{community_identifier}.csv"
+
+
+def load_comments(path):
+    """Load a comments CSV, or an empty table if it does not exist yet."""
+    if path and os.path.exists(path):
+        return pd.read_csv(path)
+    return pd.DataFrame(columns=COMMENT_COLUMNS)
+
+
+def _comment_time_to_date(comment_time):
+    """Comment times read '5h', '2d' or 'Oct 3'; reuse the feed's parser."""
+    comment_time = comment_time.replace("(edited)", "").strip()
+    if re.fullmatch(r"\d+[hd]", comment_time):
+        comment_time = f"{comment_time} ago"
+    return convert_post_time_to_date(comment_time)
+
+
+def scrape_post_comments(driver, post_url):
+    """Scrape the commenters of a single post's detail view."""
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+    comments = []
+    driver.get(post_url)
+    try:
+        WebDriverWait(driver, 20).until(
+            EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'CommentItemContainer')]")))
+    except TimeoutException:
+        print(f"No comments loaded for {post_url}.")
+        return comments
+
+    for comment in driver.find_elements(By.XPATH, "//div[contains(@class, 'CommentItemContainer')]"):
+        try:
+            commenter = comment.find_element(
+                By.XPATH, ".//span[contains(@class, 'UserNameText')]").text
+
+            try:
+                profile_picture = comment.find_element(
+                    By.XPATH, ".//div[contains(@class, 'AvatarWrapper')]//img"
+                ).get_attribute("src") or "N/A"
+            except NoSuchElementException:
+                profile_picture = "N/A"
+
+            try:
+                comment_time = comment.find_element(
+                    By.XPATH, ".//div[contains(@class, 'CommentTime')]").text
+            except NoSuchElementException:
+                comment_time = ""
+
+            try:
+                replies_text = comment.find_element(
+                    By.XPATH, ".//div[contains(@class, 'RepliesCount')]").text
+                replies = int(re.search(r"\d+", replies_text).group())
+            except (NoSuchElementException, AttributeError):
+                replies = 0
+
+            comments.append({
+                "Commenter": commenter,
+                "Profile Picture": profile_picture,
+                "Comment Date": _comment_time_to_date(comment_time),
+                "Replies": replies,
+            })
+        except NoSuchElementException as e:
+            print(f"An element was not found: {e}")
+    return comments
+
+
+def posts_needing_detail(posts_df, existing_comments):
+    """Return the posts whose comment threads are new or have changed."""
+    posts = add_post_ids(posts_df.copy())
+    posts["Comments"] = pd.to_numeric(
+        posts["Comments"], errors="coerce").fillna(0).astype(int)
+    has_url = posts.get("Post URL", pd.Series("", index=posts.index)).astype(
+        str).str.startswith("http")
+    posts = posts[has_url & (posts["Comments"] > 0)]
+
+    known_counts = existing_comments.groupby("Post ID")["Post Comments"].first()
+    previous = posts["Post ID"].map(known_counts)
+    return posts[previous.isna() | (previous != posts["Comments"])]
+
+
+def deep_scrape_comments(posts_df, community_identifier, drivers=None,
+                         max_workers=DEFAULT_MAX_WORKERS,
+                         min_interval=DEFAULT_MIN_INTERVAL, progress=None):
+    """Fetch comment threads for new or changed posts and update the comments CSV.
+
+    drivers are already logged-in WebDrivers to reuse; more are started (and
+    quit afterwards) until there is one per worker. progress(done, total) is
+    called after each post.
+    """
+    from skool_community_posts import login_and_get_driver
+
+    output_file = comments_output_file(community_identifier)
+    existing = load_comments(output_file)
+    pending = posts_needing_detail(posts_df, existing)
+    total = len(pending)
+    print(f"Deep scraping {total} posts with new or changed comments.")
+    if total == 0:
+        return output_file if os.path.exists(output_file) else None
+
+    drivers = list(drivers or [])
+    own_drivers = []
+    while len(drivers) + len(own_drivers) < min(max_workers, total):
+        driver = login_and_get_driver()
+        if driver is None:
+            break
+        own_drivers.append(driver)
+    pool = queue.Queue()
+    for driver in drivers + own_drivers:
+        pool.put(driver)
+    if pool.empty():
+        print("No WebDriver available for the deep scrape.")
+        return None
+
+    limiter = HostRateLimiter(min_interval)
+    date_scraped = datetime.utcnow().strftime("%d/%m/%Y")
+
+    def fetch(post):
+        driver = pool.get()
+        try:
+            limiter.wait(post["Post URL"])
+            rows = scrape_post_comments(driver, post["Post URL"])
+        finally:
+            pool.put(driver)
+        for row in rows:
+            row.update({"Post ID": post["Post ID"],
+                        "Post Comments": post["Comments"],
+                        "Date Scraped": date_scraped})
+        return post["Post ID"], rows
+
+    fetched = {}
+    try:
+        with ThreadPoolExecutor(max_workers=pool.qsize()) as executor:
+            futures = [executor.submit(fetch, post)
+                       for _, post in pending.iterrows()]
+            for done, future in enumerate(as_completed(futures), start=1):
+                try:
+                    post_id, rows = future.result()
+                    fetched[post_id] = rows
+                except Exception as e:
+                    print(f"An error occurred while scraping comments: {e}")
+                if progress is not None:
+                    progress(done, total)
+    finally:
+        for driver in own_drivers:
+            driver.quit()
+
+    # Replace the threads that were re-fetched and keep everything else
+    kept = existing[~existing["Post ID"].isin(list(fetched))]
+    new_rows = pd.DataFrame(
+        [row for rows in fetched.values() for row in rows], columns=COMMENT_COLUMNS)
+    comments = pd.concat([kept, new_rows], ignore_index=True)[COMMENT_COLUMNS]
+    comments.to_csv(output_file, index=False)
+    print(f"Saved {len(comments)} comments to {output_file}.")
+    return output_file
@@ -0,0 +1,263 @@
+"""Render the engagement dashboard views to static HTML/PDF reports.
+
+Renders the same views as streamlit_engagement_dashboard.py (posts by day and
+week, categories, owner vs members, top posts, the leaderboards and member
+retention) without Streamlit. Each dataset/month pair is rendered in its own
+worker process.
+
+Usage:
+    python skool_report_cli.py data/community_a.csv=Owner\\ Name data/community_b.csv \\
+        --months "October 2024" "November 2024" --output-dir reports --pdf
+
+Datasets may be plain, gzip- or zstd-compressed CSV (.csv.gz, .csv.zst) or
+Parquet. A dataset may be given as PATH=OWNER to name the community owner
+for the owner-dependent views. --all-months renders every month found in
+each dataset plus the whole period. --pdf prints each report with headless
+Chromium through pyppeteer; set SKOOL_CHROME_PATH to use an installed Chrome
+instead of the one pyppeteer downloads.
+"""
+import argparse
+import asyncio
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from html import escape
+from pathlib import Path
+
+import pandas as pd
+
+import skool_analytics as analytics
+
+PLOTLY_JS_FILE = "plotly.min.js"
+
+
+@lru_cache(maxsize=8)
+def _load_dataset(path, mtime):
+    """Load and prepare a posts table once per worker process."""
+    return analytics.prepare_posts(analytics.read_table(path))
+
+
+def _load_comments(path):
+    if not path or not os.path.exists(path):
+        return None
+    return analytics.prepare_comments(analytics.read_table(path))
+
+
+def _chart(fig):
+    return ("<div class='chart-container'>"
+            + fig.to_html(full_html=False, include_plotlyjs=False)
+            + "</div>")
+
+
+def _time_series_sections(report):
+    """The daily and weekly charts, or just one when the range is long
+    enough for both to use the same bucket."""
+    sections = []
+    buckets = set()
+    for view in ["posts_by_day", "posts_by_week"]:
+        bucket, counts = report[view]
+        if bucket not in buckets:
+            buckets.add(bucket)
+            sections.append(f"<h2>Posts by {analytics.BUCKET_LABELS[bucket]}</h2>"
+                            + _chart(analytics.posts_over_time_figure(bucket, counts)))
+    return "".join(sections)
+
+
+def _leaderboard_section(report, metrics, avatars):
+    columns = []
+    for metric in metrics:
+        board = report[f"leaderboard:{metric}"]
+        avatars.prefetch(board['Profile Picture'])
+        columns.append(
+            "<div style='flex: 1;'>"
+            f"<h4 class='leaderboard-header'>{metric}</h4>"
+            "<div class='leaderboard-table'>"
+            + analytics.leaderboard_html(board, metric, avatars.thumbnail_uri)
+            + "</div></div>")
+    return ("<div style='page-break-before: always; page-break-inside: avoid;'>"
+            "<h2>User Engagement Leaderboard</h2><h3>Top 20 Members by</h3>"
+            "<div style='display: flex; gap: 20px;'>" + "".join(columns) + "</div></div>")
+
+
+def render_report_html(df, month='All', owner=None, comments_df=None, title=None,
+                       fingerprint=None):
+    """Render one community/month report as a standalone HTML page.
+
+    df and comments_df are the prepared, unfiltered tables; the views come
+    from analytics.compute_report.
+    """
+    from skool_avatar_cache import avatar_cache
+
+    report = analytics.compute_report(df, month, owner, comments_df, fingerprint)
+    avatars = avatar_cache()
+    title = title or "Skool Community Post Engagement Dashboard"
+
+    parts = [
+        "<h1>" + escape(title) + "</h1>",
+        f"<h3>{escape(month if month != 'All' else 'All months')}</h3>",
+        _time_series_sections(report),
+        "<div class='page-break full-page'>",
+        "<h2>Posts by Category</h2>",
+        _chart(analytics.category_figure(report["categories"])),
+    ]
+    if owner:
+        parts += [
+            "<h2>Posts by Owner vs Members</h2>",
+            _chart(analytics.owner_vs_members_figure(report["owner_vs_members"])),
+        ]
+    parts += [
+        "</div>",
+        "<div class='page-break full-page'><h2>Top Performing Posts</h2>",
+        "<h3>Top 5 Performing Posts by Total Engagement</h3>",
+        report["top_posts"].to_html(classes='custom-table', index=False),
+    ]
+    if owner:
+        parts += [
+            "<h3>Top 5 Performing Posts by Total Engagement (Excluding Community Owner)</h3>",
+            report["top_posts_excluding_owner"].to_html(classes='custom-table', index=False),
+        ]
+    parts.append("</div>")
+    parts.append(_leaderboard_section(report, ["Posts", "Likes"], avatars))
+    parts.append(_leaderboard_section(report, ["Comments", "Total Engagement"], avatars))
+    if "leaderboard:Comments Given" in report:
+        parts.append(_leaderboard_section(report, ["Comments Given"], avatars))
+    if not report["retention"].empty:
+        parts.append("<div class='page-break full-page'><h2>Member Retention</h2>"
+                     "<h3>Members Posting Again, by Week of First Post</h3>"
+                     + _chart(analytics.retention_figure(report["retention"])) + "</div>")
+
+    return ("<!DOCTYPE html><html><head><meta charset='utf-8'>"
+            f"<title>{escape(title)} - {escape(month)}</title>"
+            f"<script src='{PLOTLY_JS_FILE}'></script>"
+            + analytics.DASHBOARD_CSS + analytics.LEADERBOARD_CSS
+            + "</head><body>" + "\n".join(parts) + "</body></html>")
+
+
+async def _print_pdf(html_path, pdf_path):
+    from pyppeteer import launch
+
+    options = {"args": ["--no-sandbox"]}
+    if os.getenv("SKOOL_CHROME_PATH"):
+        options["executablePath"] = os.environ["SKOOL_CHROME_PATH"]
+    browser = await launch(**options)
+    try:
+        page = await browser.newPage()
+        await page.goto(Path(html_path).resolve().as_uri(), {"waitUntil": "networkidle0"})
+        await page.pdf({"path": str(pdf_path), "format": "A4", "printBackground": True})
+    finally:
+        await browser.close()
+
+
+def html_to_pdf(html_path, pdf_path):
+    """Print a rendered report to PDF with headless Chromium, honouring the print CSS."""
+    asyncio.run(_print_pdf(html_path, pdf_path))
+
+
+def _slug(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_").lower()
+
+
+def render_report(dataset_path, community, month, owner, comments_path, output_dir, pdf):
+    """Worker entry point: render one dataset/month and return the files written."""
+    mtime = os.path.getmtime(dataset_path)
+    df = _load_dataset(dataset_path, mtime)
+    comments_df = _load_comments(comments_path)
+    html = render_report_html(df, month, owner, comments_df, title=community,
+                              fingerprint=f"{os.path.abspath(dataset_path)}:{mtime}")
+
+    html_path = Path(output_dir) / f"{_slug(community)}_{_slug(month)}.html"
+    html_path.write_text(html, encoding="utf-8")
+    written = [str(html_path)]
+    if pdf:
+        pdf_path = html_path.with_suffix(".pdf")
+        html_to_pdf(html_path, pdf_path)
+        written.append(str(pdf_path))
+    return written
+
+
+def _parse_dataset(spec):
+    path, _, owner = spec.partition("=")
+    return path, owner or None
+
+
+def _community_names(paths):
+    """Report names of the datasets, made unique so no two write the same files.
+
+    A name is the file name without extensions (e.g. .csv.gz); datasets that
+    share one are told apart by their directory, then by a number.
+    """
+    stems = [Path(path).name.split('.')[0] for path in paths]
+    names = [
+        f"{Path(path).resolve().parent.name}_{stem}" if stems.count(stem) > 1 else stem
+        for path, stem in zip(paths, stems)
+    ]
+    totals = {name: names.count(name) for name in names}
+    seen = {}
+    for i, name in enumerate(names):
+        if totals[name] > 1:
+            seen[name] = seen.get(name, 0) + 1
+            names[i] = f"{name}_{seen[name]}"
+    return names
+
+
+def _months_for(path, args):
+    if args.all_months:
+        dates = pd.to_datetime(analytics.read_table(path, columns=["Post Date"])["Post Date"],
+                               format=analytics.DATE_FORMAT)
+        return ["All"] + dates.dt.strftime(analytics.MONTH_FORMAT).unique().tolist()
+    return args.months
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render Skool engagement reports without Streamlit.")
+    parser.add_argument("datasets", nargs="+", metavar="CSV[=OWNER]",
+                        help="Scraped posts CSV or Parquet file, optionally with the community owner's name")
+    parser.add_argument("--months", nargs="+", default=["All"],
+                        help='Months to render, e.g. "October 2024" (default: All)')
+    parser.add_argument("--all-months", action="store_true",
+                        help="Render the whole period and every month in each dataset")
+    parser.add_argument("--comments", nargs="*", default=[],
+                        help="Deep-scrape comments CSVs, in the same order as the datasets")
+    parser.add_argument("--output-dir", default="reports")
+    parser.add_argument("--pdf", action="store_true",
+                        help="Also print each report to PDF (needs pyppeteer)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(),
+                        help="Number of rendering processes")
+    args = parser.parse_args(argv)
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    # All reports share one copy of plotly.js instead of inlining it
+    import plotly.offline
+    (output_dir / PLOTLY_JS_FILE).write_text(plotly.offline.get_plotlyjs(), encoding="utf-8")
+
+    datasets = [_parse_dataset(spec) for spec in args.datasets]
+    communities = _community_names([path for path, _ in datasets])
+    tasks = []
+    for i, ((path, owner), community) in enumerate(zip(datasets, communities)):
+        comments_path = args.comments[i] if i < len(args.comments) else None
+        for month in _months_for(path, args):
+            tasks.append((path, community, month, owner, comments_path, str(output_dir), args.pdf))
+
+    start = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(render_report, *task): task for task in tasks}
+        for done, future in enumerate(as_completed(futures), start=1):
+            path, _, month = futures[future][:3]
+            try:
+                written = future.result()
+                print(f"[{done}/{len(tasks)}] {', '.join(written)}")
+            except Exception as e:
+                failures += 1
+                print(f"[{done}/{len(tasks)}] Failed to render {path} ({month}): {e}")
+    print(f"Rendered {len(tasks) - failures} reports in {time.perf_counter() - start:.1f}s.")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,293 @@
+"""Freshness-aware scrape scheduler for many communities.
+
+Keeps a registry of communities in a local SQLite file and re-scrapes each
+one when it is due. After every scrape the next interval is derived from the
+community's history in the engagement snapshot store:
+
+- the observed change rate (posts that changed per hour over the recent
+  scrapes) sets the interval to roughly CHANGES_PER_SCRAPE changes, so busy
+  communities are scraped often;
+- a community that has not changed for a while waits at least
+  DORMANCY_FACTOR times that quiet period, so dormant ones are scraped rarely.
+
+Scrapes run on a bounded pool of workers, at most max_per_host at a time per
+host and spaced out per host with a jittered rate limit. Due times and failure
+backoff live in the registry, so the queue survives restarts; a community
+whose scrape was interrupted by a crash is picked up again once its lease
+expires.
+
+The scrape function is injectable. It is called as
+scrape(community_url, owner, deep_scrape), must record the scrape in the
+snapshot store (as scrape_community_data does) and raise on failure. To run
+against a local stand-in site, set SKOOL_BASE_URL and register its URLs.
+
+Usage:
+    python skool_scheduler.py add https://www.skool.com/my-community --owner "Owner Name"
+    python skool_scheduler.py list
+    python skool_scheduler.py run --workers 2 --host-interval 30
+"""
+import argparse
+import random
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from urllib.parse import urlparse
+
+import pandas as pd
+
+from skool_community_posts import community_identifier_from_url
+from skool_post_comments import HostRateLimiter
+from skool_snapshot_store import SnapshotStore
+
+DEFAULT_PATH = "scrape_schedule.db"
+
+MIN_INTERVAL = 15 * 60
+MAX_INTERVAL = 7 * 24 * 3600
+DEFAULT_INTERVAL = 6 * 3600  # until a community has enough history
+CHANGES_PER_SCRAPE = 10
+DORMANCY_FACTOR = 0.5
+RETRY_INTERVAL = 10 * 60  # doubled after each consecutive failure
+LEASE_SECONDS = 6 * 3600  # longest a scrape may take before it is retried
+DEFAULT_JITTER = 0.2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS communities (
+    community_url TEXT PRIMARY KEY,
+    owner TEXT,
+    deep_scrape INTEGER NOT NULL DEFAULT 0,
+    next_due REAL NOT NULL,
+    interval REAL NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    leased_until REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS communities_by_due ON communities (next_due);
+"""
+
+
+def refresh_interval(history, now):
+    """Seconds until the next scrape, from a community's scrape history.
+
+    history is SnapshotStore.scrape_history(): observed_at, posts_seen and
+    posts_changed per scrape, oldest first.
+    """
+    if len(history) < 2:
+        return DEFAULT_INTERVAL
+    # The first scrape in the window only records baselines
+    changed = history["posts_changed"].iloc[1:]
+    span = history["observed_at"].iloc[-1] - history["observed_at"].iloc[0]
+    rate = changed.sum() / span if span > 0 else 0
+    interval = CHANGES_PER_SCRAPE / rate if rate else MAX_INTERVAL
+
+    changed_at = history["observed_at"].iloc[1:][changed > 0]
+    last_change = changed_at.iloc[-1] if len(changed_at) else history["observed_at"].iloc[0]
+    interval = max(interval, DORMANCY_FACTOR * (now - last_change))
+    return float(min(max(interval, MIN_INTERVAL), MAX_INTERVAL))
+
+
+def default_scrape(community_url, owner, deep_scrape):
+    from skool_community_posts import scrape_community_data
+
+    if scrape_community_data(community_url, owner, deep_scrape=deep_scrape) is None:
+        raise RuntimeError(f"No posts scraped from {community_url}")
+
+
+class ScheduleRegistry:
+    """The persisted registry and queue of communities to keep fresh."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = str(path)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def add(self, community_url, owner=None, deep_scrape=False, now=None):
+        """Register a community, due immediately; re-adding updates its settings."""
+        now = time.time() if now is None else now
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "INSERT INTO communities (community_url, owner, deep_scrape, next_due, interval)"
+                " VALUES (?, ?, ?, ?, ?) ON CONFLICT (community_url) DO UPDATE"
+                " SET owner = excluded.owner, deep_scrape = excluded.deep_scrape",
+                (community_url, owner, int(deep_scrape), now, DEFAULT_INTERVAL))
+
+    def remove(self, community_url):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM communities WHERE community_url = ?", (community_url,))
+
+    def communities(self):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(
+                "SELECT community_url, owner, deep_scrape, next_due, interval, failures,"
+                " last_error FROM communities ORDER BY next_due", conn)
+
+    def lease_due(self, now, limit, exclude_hosts=()):
+        """Claim up to limit due communities, most overdue first.
+
+        Communities on a host in exclude_hosts are skipped so that per-host
+        concurrency holds.
+        """
+        leased = []
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT community_url, owner, deep_scrape FROM communities"
+                " WHERE next_due <= ? AND leased_until <= ? ORDER BY next_due",
+                (now, now)).fetchall()
+            hosts = set(exclude_hosts)
+            for community_url, owner, deep_scrape in rows:
+                if len(leased) == limit:
+                    break
+                host = urlparse(community_url).netloc
+                if host in hosts:
+                    continue
+                hosts.add(host)
+                conn.execute(
+                    "UPDATE communities SET leased_until = ? WHERE community_url = ?",
+                    (now + LEASE_SECONDS, community_url))
+                leased.append((community_url, owner, bool(deep_scrape)))
+        return leased
+
+    def complete(self, community_url, interval, now, jitter=DEFAULT_JITTER):
+        next_due = now + interval * (1 + random.uniform(-jitter, jitter))
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE communities SET next_due = ?, interval = ?, failures = 0,"
+                " last_error = NULL, leased_until = 0 WHERE community_url = ?",
+                (next_due, interval, community_url))
+
+    def fail(self, community_url, error, now):
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT failures FROM communities WHERE community_url = ?",
+                (community_url,)).fetchone()
+            if row is None:
+                return  # removed while its scrape was running
+            retry = min(RETRY_INTERVAL * 2 ** row[0], MAX_INTERVAL)
+            conn.execute(
+                "UPDATE communities SET next_due = ?, failures = failures + 1,"
+                " last_error = ?, leased_until = 0 WHERE community_url = ?",
+                (now + retry, str(error), community_url))
+
+
+class Scheduler:
+    """Runs due scrapes under global and per-host concurrency and rate limits."""
+
+    def __init__(self, registry, scrape=default_scrape, snapshots=None,
+                 max_workers=2, max_per_host=1, host_interval=30.0,
+                 jitter=DEFAULT_JITTER, clock=time.time):
+        self.registry = registry
+        self.scrape = scrape
+        self.snapshots = snapshots or SnapshotStore()
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        self.jitter = jitter
+        self.clock = clock
+        self._limiter = HostRateLimiter(host_interval, jitter=jitter)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._running = {}  # community_url -> host
+        self._stop = threading.Event()
+
+    def _full_hosts(self):
+        counts = {}
+        for host in self._running.values():
+            counts[host] = counts.get(host, 0) + 1
+        return {host for host, count in counts.items() if count >= self.max_per_host}
+
+    def run_pending(self):
+        """Start scrapes for due communities while workers are free."""
+        with self._lock:
+            free = self.max_workers - len(self._running)
+            if free <= 0:
+                return []
+            # lease_due hands out at most one community per host per call
+            leased = self.registry.lease_due(self.clock(), free, self._full_hosts())
+            for community_url, _, _ in leased:
+                self._running[community_url] = urlparse(community_url).netloc
+        for entry in leased:
+            self._executor.submit(self._run, *entry)
+        return [community_url for community_url, _, _ in leased]
+
+    def _run(self, community_url, owner, deep_scrape):
+        try:
+            self._limiter.wait(community_url)
+            print(f"Scraping {community_url}.")
+            self.scrape(community_url, owner, deep_scrape)
+            now = self.clock()
+            history = self.snapshots.scrape_history(
+                community_identifier_from_url(community_url))
+            interval = refresh_interval(history, now)
+            self.registry.complete(community_url, interval, now, self.jitter)
+            print(f"Scraped {community_url}; next in {interval / 3600:.1f}h.")
+        except Exception as e:
+            print(f"Scraping {community_url} failed: {e}")
+            self.registry.fail(community_url, e, self.clock())
+        finally:
+            with self._lock:
+                self._running.pop(community_url, None)
+
+    def run_forever(self, poll=30.0):
+        """Poll the registry until stop() is called."""
+        try:
+            while not self._stop.is_set():
+                self.run_pending()
+                self._stop.wait(poll)
+        finally:
+            self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Keep Skool communities freshly scraped.")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="Register a community to keep fresh")
+    add.add_argument("community_url")
+    add.add_argument("--owner")
+    add.add_argument("--deep-scrape", action="store_true")
+
+    remove = commands.add_parser("remove", help="Stop scheduling a community")
+    remove.add_argument("community_url")
+
+    commands.add_parser("list", help="Show the registry and when each community is due")
+
+    run = commands.add_parser("run", help="Run the scheduler until interrupted")
+    run.add_argument("--workers", type=int, default=2, help="Concurrent scrapes overall")
+    run.add_argument("--per-host", type=int, default=1, help="Concurrent scrapes per host")
+    run.add_argument("--host-interval", type=float, default=30.0,
+                     help="Minimum seconds between scrapes starting on one host")
+    run.add_argument("--jitter", type=float, default=DEFAULT_JITTER)
+    run.add_argument("--poll", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    registry = ScheduleRegistry(args.db)
+    if args.command == "add":
+        registry.add(args.community_url, args.owner, args.deep_scrape)
+    elif args.command == "remove":
+        registry.remove(args.community_url)
+    elif args.command == "list":
+        communities = registry.communities()
+        communities["next_due"] = pd.to_datetime(communities["next_due"], unit="s").dt.round("s")
+        communities["interval"] = (communities["interval"] / 3600).round(1).astype(str) + "h"
+        print(communities.to_string(index=False))
+    else:
+        scheduler = Scheduler(registry, max_workers=args.workers,
+                              max_per_host=args.per_host,
+                              host_interval=args.host_interval, jitter=args.jitter)
+        try:
+            scheduler.run_forever(args.poll)
+        except KeyboardInterrupt:
+            scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""Background scrape jobs shared by every Streamlit session of the process.
+
+A ScrapeJobManager owns the worker threads that run scrape_community_data.
+Jobs are keyed by community identifier, so a session that reconnects (or a
+different tab) can attach to a scrape that is already running and read its
+progress and the posts collected so far.
+"""
+import os
+import threading
+import traceback
+from datetime import datetime
+
+import pandas as pd
+
+from skool_community_posts import community_identifier_from_url, remove_duplicates
+
+
+class ScrapeJob:
+    """Progress and partial results of a single background scrape."""
+
+    def __init__(self, community_url, community_owner, deep_scrape=False):
+        self.job_id = community_identifier_from_url(community_url)
+        self.community_url = community_url
+        self.community_owner = community_owner
+        self.deep_scrape = deep_scrape
+        self.status = "running"
+        self.pages_done = 0
+        self.details_done = 0
+        self.details_total = 0
+        self.output_file = None
+        self.comments_file = None
+        self.error = None
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+        self._posts = []
+        self._lock = threading.Lock()
+
+    @property
+    def running(self):
+        return self.status == "running"
+
+    @property
+    def posts_collected(self):
+        with self._lock:
+            return len(self._posts)
+
+    def update(self, pages_done, posts_data):
+        """Progress callback passed to the scraper."""
+        with self._lock:
+            self.pages_done = pages_done
+            self._posts = list(posts_data)
+
+    def update_details(self, details_done, details_total):
+        """Progress callback for the deep comment scrape."""
+        with self._lock:
+            self.details_done = details_done
+            self.details_total = details_total
+
+    def partial_frame(self):
+        """Return the posts collected so far, shaped like the scraped CSV."""
+        with self._lock:
+            posts = list(self._posts)
+        if not posts:
+            return None
+        df = pd.DataFrame(posts)
+        remove_duplicates(df)
+        for column in ["Likes", "Comments"]:
+            df[column] = pd.to_numeric(
+                df[column], errors="coerce").fillna(0).astype(int)
+        return df.reset_index(drop=True)
+
+    def _finish(self, status, output_file=None, comments_file=None, error=None):
+        with self._lock:
+            self.status = status
+            self.output_file = output_file
+            self.comments_file = comments_file
+            self.error = error
+            self.finished_at = datetime.utcnow()
+
+
+class ScrapeJobManager:
+    """Runs scrape jobs on worker threads and keeps them attachable by id."""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def start(self, community_url, community_owner, deep_scrape=False):
+        """Start scraping a community, or return the job already running for it."""
+        job = ScrapeJob(community_url, community_owner, deep_scrape)
+        with self._lock:
+            existing = self._jobs.get(job.job_id)
+            if existing is not None and existing.running:
+                return existing
+            self._jobs[job.job_id] = job
+        worker = threading.Thread(
+            target=self._run, args=(job,), name=f"scrape-{job.job_id}", daemon=True)
+        worker.start()
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self):
+        """Return all known jobs, most recently started first."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return sorted(jobs, key=lambda job: job.started_at, reverse=True)
+
+    def _run(self, job):
+        # Imported here so the Selenium stack only loads once a job starts
+        from skool_community_posts import scrape_community_data
+        from skool_post_comments import comments_output_file
+
+        try:
+            output_file = scrape_community_data(
+                job.community_url, job.community_owner, progress=job.update,
+                deep_scrape=job.deep_scrape, detail_progress=job.update_details)
+        except Exception as e:
+            traceback.print_exc()
+            job._finish("failed", error=str(e))
+            return
+        if output_file:
+            comments_file = comments_output_file(job.job_id)
+            job._finish("finished", output_file=output_file,
+                        comments_file=comments_file if os.path.exists(comments_file) else None)
+        else:
+            job._finish("failed", error="No data was collected.")
@@ -0,0 +1,247 @@
+"""Append-only store of engagement snapshots from repeated scrapes.
+
+Each scrape used to overwrite the previous CSV, losing how likes and comments
+grow over time. The snapshot store keeps every scrape of a community in a
+local SQLite file as a delta-encoded time series per post: a row is written
+only for posts whose like or comment count changed since the last scrape,
+and it holds the change, not the new total. Storage therefore grows with
+the number of changes rather than with scrapes x posts, and "engagement
+gained in a window" is a single indexed SUM over the deltas.
+
+The first sighting of a post is stored as a baseline delta (from zero) and
+is left out of velocity queries, so growth is always measured between two
+scrapes.
+
+Usage:
+    python skool_snapshot_store.py record my-community scraped_community_posts_my-community.csv
+    python skool_snapshot_store.py velocity my-community --hours 24 --by member
+"""
+import argparse
+import sqlite3
+import sys
+import time
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+
+from skool_community_posts import add_post_ids
+
+DEFAULT_PATH = "engagement_snapshots.db"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    post_key INTEGER PRIMARY KEY,
+    community TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    name TEXT,
+    title TEXT,
+    first_seen INTEGER NOT NULL,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    last_changed INTEGER NOT NULL,
+    UNIQUE (community, post_id)
+);
+CREATE TABLE IF NOT EXISTS deltas (
+    post_key INTEGER NOT NULL,
+    observed_at INTEGER NOT NULL,
+    likes_delta INTEGER NOT NULL,
+    comments_delta INTEGER NOT NULL,
+    baseline INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (post_key, observed_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS deltas_by_time ON deltas (observed_at, post_key);
+CREATE TABLE IF NOT EXISTS scrapes (
+    community TEXT NOT NULL,
+    observed_at INTEGER NOT NULL,
+    posts_seen INTEGER NOT NULL,
+    posts_changed INTEGER NOT NULL,
+    PRIMARY KEY (community, observed_at)
+);
+"""
+
+
+class SnapshotStore:
+    """Delta-encoded like/comment history of every scraped post."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = str(path)
+        with closing(self._connect()) as conn:
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def record_scrape(self, community, posts_df, observed_at=None):
+        """Append one scrape of a community; returns the number of changed posts.
+
+        observed_at is a datetime or unix timestamp and defaults to now. It
+        may not be earlier than the community's last scrape, as deltas are
+        taken against the latest totals; a scrape at the same time as the
+        last one adds to its deltas.
+        """
+        if observed_at is None:
+            observed_at = int(time.time())
+        elif isinstance(observed_at, datetime):
+            observed_at = int(observed_at.timestamp())
+
+        posts = add_post_ids(posts_df.copy()).drop_duplicates(subset="Post ID")
+        likes = pd.to_numeric(posts["Likes"], errors="coerce").fillna(0).astype(int)
+        comments = pd.to_numeric(posts["Comments"], errors="coerce").fillna(0).astype(int)
+
+        with closing(self._connect()) as conn, conn:
+            (last_scraped,) = conn.execute(
+                "SELECT MAX(observed_at) FROM scrapes WHERE community = ?",
+                (community,)).fetchone()
+            if last_scraped is not None and observed_at < last_scraped:
+                raise ValueError(
+                    f"Scrape of {community} at {datetime.fromtimestamp(observed_at)} is older"
+                    f" than its last scrape at {datetime.fromtimestamp(last_scraped)}")
+            known = {
+                post_id: (post_key, old_likes, old_comments)
+                for post_key, post_id, old_likes, old_comments in conn.execute(
+                    "SELECT post_key, post_id, likes, comments FROM posts WHERE community = ?",
+                    (community,))
+            }
+            changed = 0
+            for post_id, name, title, new_likes, new_comments in zip(
+                    posts["Post ID"], posts["Name"], posts["Title"], likes, comments):
+                new_likes, new_comments = int(new_likes), int(new_comments)
+                if post_id in known:
+                    post_key, old_likes, old_comments = known[post_id]
+                    if (new_likes, new_comments) == (old_likes, old_comments):
+                        continue
+                    conn.execute(
+                        "UPDATE posts SET likes = ?, comments = ?, last_changed = ? WHERE post_key = ?",
+                        (new_likes, new_comments, observed_at, post_key))
+                    baseline = 0
+                else:
+                    post_key = conn.execute(
+                        "INSERT INTO posts (community, post_id, name, title, first_seen,"
+                        " likes, comments, last_changed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        (community, post_id, name, title, observed_at,
+                         new_likes, new_comments, observed_at)).lastrowid
+                    old_likes = old_comments = 0
+                    baseline = 1
+                conn.execute(
+                    "INSERT INTO deltas VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (post_key, observed_at) DO UPDATE"
+                    " SET likes_delta = likes_delta + excluded.likes_delta,"
+                    " comments_delta = comments_delta + excluded.comments_delta,"
+                    " baseline = MAX(baseline, excluded.baseline)",
+                    (post_key, observed_at, new_likes - old_likes,
+                     new_comments - old_comments, baseline))
+                changed += 1
+            conn.execute(
+                "INSERT INTO scrapes VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (community, observed_at) DO UPDATE"
+                " SET posts_seen = MAX(posts_seen, excluded.posts_seen),"
+                " posts_changed = posts_changed + excluded.posts_changed",
+                (community, observed_at, len(posts), changed))
+        return changed
+
+    def last_scraped(self, community):
+        """Unix time of the most recent scrape of a community, or None."""
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                "SELECT MAX(observed_at) FROM scrapes WHERE community = ?",
+                (community,)).fetchone()[0]
+
+    def scrape_history(self, community, limit=10):
+        """The most recent scrapes of a community, oldest first."""
+        query = """
+            SELECT observed_at, posts_seen, posts_changed FROM scrapes
+            WHERE community = ? ORDER BY observed_at DESC LIMIT ?
+        """
+        with closing(self._connect()) as conn:
+            history = pd.read_sql_query(query, conn, params=(community, limit))
+        return history.iloc[::-1].reset_index(drop=True)
+
+    def engagement_velocity(self, community, hours=24, by="post", until=None):
+        """Likes and comments gained per post or member in the last `hours`.
+
+        The window ends at `until` (unix time), by default the community's
+        latest scrape, so historical imports can be queried as well.
+        """
+        if until is None:
+            until = self.last_scraped(community)
+            if until is None:
+                return pd.DataFrame(
+                    columns=["Name", "Likes Gained", "Comments Gained", "Engagement Gained"])
+        since = until - hours * 3600
+        group = "p.post_key" if by == "post" else "p.name"
+        columns = "p.post_id AS 'Post ID', p.name AS Name, p.title AS Title" \
+            if by == "post" else "p.name AS Name"
+        query = f"""
+            SELECT {columns},
+                   SUM(d.likes_delta) AS 'Likes Gained',
+                   SUM(d.comments_delta) AS 'Comments Gained',
+                   SUM(d.likes_delta + d.comments_delta) AS 'Engagement Gained'
+            FROM deltas d JOIN posts p ON p.post_key = d.post_key
+            WHERE d.observed_at > ? AND d.observed_at <= ?
+              AND d.baseline = 0 AND p.community = ?
+            GROUP BY {group}
+            ORDER BY "Engagement Gained" DESC
+        """
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(query, conn, params=(since, until, community))
+
+    def history(self, community, post_id):
+        """Running like and comment totals of one post at each change."""
+        query = """
+            SELECT d.observed_at, d.likes_delta, d.comments_delta
+            FROM deltas d JOIN posts p ON p.post_key = d.post_key
+            WHERE p.community = ? AND p.post_id = ?
+            ORDER BY d.observed_at
+        """
+        with closing(self._connect()) as conn:
+            deltas = pd.read_sql_query(query, conn, params=(community, post_id))
+        return pd.DataFrame({
+            "Observed At": pd.to_datetime(deltas["observed_at"], unit="s"),
+            "Likes": deltas["likes_delta"].cumsum(),
+            "Comments": deltas["comments_delta"].cumsum(),
+        })
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Engagement snapshot store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Append a scraped CSV as a snapshot")
+    record.add_argument("community")
+    record.add_argument("csv")
+    record.add_argument("--observed-at",
+                        help="Snapshot time as DD/MM/YYYY (default: the CSV's Date Scraped)")
+
+    velocity = commands.add_parser("velocity", help="Engagement gained in a time window")
+    velocity.add_argument("community")
+    velocity.add_argument("--hours", type=float, default=24)
+    velocity.add_argument("--by", choices=["post", "member"], default="post")
+    velocity.add_argument("--top", type=int, default=20)
+
+    for command in (record, velocity):
+        command.add_argument("--db", default=DEFAULT_PATH)
+    args = parser.parse_args(argv)
+
+    store = SnapshotStore(args.db)
+    if args.command == "record":
+        posts = pd.read_csv(args.csv)
+        if args.observed_at:
+            observed_at = datetime.strptime(args.observed_at, "%d/%m/%Y")
+        else:
+            observed_at = pd.to_datetime(
+                posts["Date Scraped"], format="%d/%m/%Y").max().to_pydatetime()
+        try:
+            changed = store.record_scrape(args.community, posts, observed_at)
+        except ValueError as e:
+            print(f"Not recorded: {e}")
+            return 1
+        print(f"Recorded {len(posts)} posts, {changed} changed.")
+    else:
+        velocity = store.engagement_velocity(args.community, args.hours, args.by)
+        print(velocity.head(args.top).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
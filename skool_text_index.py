@@ -0,0 +1,244 @@
+"""Inverted full-text index over post titles and descriptions.
+
+Each post's Title and Description are tokenised once, when the post is first
+ingested, into (term, post) pairs. The pairs are kept sorted by term so the
+postings of a term are one contiguous slice of a NumPy array, located through
+an offsets array. Keyword search intersects those slices, and engagement by
+keyword is a weighted bincount over all pairs, so both stay fast across
+hundreds of thousands of posts.
+
+The index is saved as <dataset>.terms.npz next to the posts CSV. Adding a
+later scrape of the same community only tokenises the posts not indexed yet.
+Uploads, which have no path, are indexed once per file content in a cache
+directory (SKOOL_TEXT_INDEX_DIR).
+
+Usage:
+    python skool_text_index.py build scraped_community_posts_my-community.csv
+    python skool_text_index.py search scraped_community_posts_my-community.csv "launch webinar"
+    python skool_text_index.py keywords scraped_community_posts_my-community.csv --top 20
+"""
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from skool_community_posts import add_post_ids
+
+DEFAULT_INDEX_DIR = Path(os.getenv(
+    "SKOOL_TEXT_INDEX_DIR", Path(__file__).parent / ".text_index_cache"))
+MAX_CACHED_INDEXES = 32
+TEXT_COLUMNS = ['Title', 'Description']
+MIN_TERM_LENGTH = 3
+STOPWORDS = frozenset("""
+    a about after all also am an and any are as at be been but by can could
+    did do does for from get got had has have how i if in into is it its
+    just like me more my no not now of on one or our out so some than that
+    the their them then there these they this to too up us very was we were
+    what when which who why will with would you your
+""".split())
+
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    """Lower-cased word tokens of a text, without stopwords and short tokens."""
+    if not isinstance(text, str):
+        return []
+    return [token for token in _TOKEN.findall(text.lower())
+            if len(token) >= MIN_TERM_LENGTH and token not in STOPWORDS]
+
+
+def index_path(dataset_path):
+    return f"{os.path.splitext(dataset_path)[0]}.terms.npz"
+
+
+class TextIndex:
+    """Term -> post postings in compact, array-backed form."""
+
+    def __init__(self, terms=(), post_ids=(), pair_terms=None, pair_posts=None):
+        self.terms = list(terms)
+        self.post_ids = list(post_ids)
+        self._term_ids = {term: i for i, term in enumerate(self.terms)}
+        self._post_numbers = {post_id: i for i, post_id in enumerate(self.post_ids)}
+        self._pair_terms = np.asarray(
+            pair_terms if pair_terms is not None else [], dtype=np.int32)
+        self._pair_posts = np.asarray(
+            pair_posts if pair_posts is not None else [], dtype=np.int32)
+        self._build_offsets()
+
+    def _build_offsets(self):
+        counts = np.bincount(self._pair_terms, minlength=len(self.terms))
+        self._offsets = np.concatenate([[0], np.cumsum(counts)])
+
+    def __len__(self):
+        return len(self.post_ids)
+
+    @property
+    def nbytes(self):
+        # The term and post id lists dominate; count their strings roughly
+        strings = sum(map(len, self.terms)) + sum(map(len, self.post_ids))
+        return (self._pair_terms.nbytes + self._pair_posts.nbytes
+                + self._offsets.nbytes + 2 * strings)
+
+    def add(self, posts_df):
+        """Tokenise and index the posts that are not in the index yet.
+
+        Returns the number of posts added.
+        """
+        posts = add_post_ids(posts_df.copy()).drop_duplicates(subset='Post ID')
+        posts = posts[~posts['Post ID'].isin(self._post_numbers)]
+        if posts.empty:
+            return 0
+
+        text = posts[[c for c in TEXT_COLUMNS if c in posts]].fillna('').astype(str)
+        new_terms, new_posts = [], []
+        for post_id, row_text in zip(posts['Post ID'], text.agg(' '.join, axis=1)):
+            post_number = len(self.post_ids)
+            self.post_ids.append(post_id)
+            self._post_numbers[post_id] = post_number
+            for token in set(tokenize(row_text)):
+                term_id = self._term_ids.get(token)
+                if term_id is None:
+                    term_id = self._term_ids[token] = len(self.terms)
+                    self.terms.append(token)
+                new_terms.append(term_id)
+                new_posts.append(post_number)
+
+        pair_terms = np.concatenate([self._pair_terms, np.asarray(new_terms, dtype=np.int32)])
+        pair_posts = np.concatenate([self._pair_posts, np.asarray(new_posts, dtype=np.int32)])
+        # Post numbers only grow, so a stable sort on term keeps each
+        # posting list sorted by post as well
+        order = np.argsort(pair_terms, kind='stable')
+        self._pair_terms, self._pair_posts = pair_terms[order], pair_posts[order]
+        self._build_offsets()
+        return len(posts)
+
+    def postings(self, term):
+        """Sorted post numbers containing a term."""
+        term_id = self._term_ids.get(term)
+        if term_id is None:
+            return self._pair_posts[:0]
+        return self._pair_posts[self._offsets[term_id]:self._offsets[term_id + 1]]
+
+    def search(self, query):
+        """Post IDs of the posts containing every term of the query."""
+        terms = tokenize(query)
+        if not terms:
+            return []
+        # Intersect the shortest posting lists first
+        lists = sorted((self.postings(term) for term in set(terms)), key=len)
+        matches = lists[0]
+        for postings in lists[1:]:
+            matches = np.intersect1d(matches, postings, assume_unique=True)
+        return [self.post_ids[i] for i in matches]
+
+    def keyword_engagement(self, df, min_posts=5, top=20):
+        """Terms ranked by average engagement per post, over the posts in df.
+
+        df is a prepared posts table; posts not in df (e.g. other months) are
+        left out, and terms used in fewer than min_posts posts are skipped.
+        """
+        engagement = add_post_ids(df.copy()).drop_duplicates(subset='Post ID').set_index(
+            'Post ID')['Total Engagement'].reindex(self.post_ids).to_numpy(dtype=float)
+        weights = engagement[self._pair_posts]
+        present = ~np.isnan(weights)
+        terms = self._pair_terms[present]
+        counts = np.bincount(terms, minlength=len(self.terms))
+        totals = np.bincount(terms, weights=weights[present], minlength=len(self.terms))
+
+        keep = np.flatnonzero(counts >= min_posts)
+        average = totals[keep] / counts[keep]
+        ranked = keep[np.argsort(-average, kind='stable')[:top]]
+        return pd.DataFrame({
+            'Keyword': [self.terms[i] for i in ranked],
+            'Posts': counts[ranked],
+            'Total Engagement': totals[ranked].astype(int),
+            'Avg Engagement': (totals[ranked] / counts[ranked]).round(1),
+        })
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path, terms=np.array(self.terms, dtype=str),
+            post_ids=np.array(self.post_ids, dtype=str),
+            pair_terms=self._pair_terms, pair_posts=self._pair_posts)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['terms'].tolist(), data['post_ids'].tolist(),
+                       data['pair_terms'], data['pair_posts'])
+
+    @classmethod
+    def for_dataset(cls, dataset_path, posts_df=None):
+        """Load the index saved next to a posts CSV, bringing it up to date.
+
+        Posts in the CSV (or posts_df, if given) that are not indexed yet are
+        added and the index is saved again.
+        """
+        path = index_path(dataset_path)
+        index = cls.load(path) if os.path.exists(path) else cls()
+        if posts_df is None:
+            posts_df = pd.read_csv(dataset_path)
+        if index.add(posts_df):
+            index.save(path)
+        return index
+
+    @classmethod
+    def for_upload(cls, fingerprint, posts_df, index_dir=DEFAULT_INDEX_DIR):
+        """Load the index saved for an uploaded file's content, building it once.
+
+        Only the MAX_CACHED_INDEXES most recently used indexes are kept.
+        """
+        index_dir = Path(index_dir)
+        path = index_dir / f"{fingerprint}.terms.npz"
+        if path.exists():
+            os.utime(path)  # mark as recently used
+            return cls.load(path)
+        index = cls()
+        index.add(posts_df)
+        index_dir.mkdir(parents=True, exist_ok=True)
+        index.save(path)
+        saved = sorted(index_dir.glob("*.terms.npz"), key=lambda p: p.stat().st_mtime)
+        for stale in saved[:-MAX_CACHED_INDEXES]:
+            stale.unlink(missing_ok=True)
+        return index
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Full-text index of scraped posts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Create or update the index of a posts CSV")
+    search = commands.add_parser("search", help="Find the posts containing all keywords")
+    keywords = commands.add_parser("keywords", help="Rank keywords by engagement per post")
+    for command in (build, search, keywords):
+        command.add_argument("csv")
+    search.add_argument("query")
+    keywords.add_argument("--min-posts", type=int, default=5)
+    keywords.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    posts = pd.read_csv(args.csv)
+    index = TextIndex.for_dataset(args.csv, posts)
+    if args.command == "build":
+        print(f"Indexed {len(index)} posts and {len(index.terms)} terms "
+              f"in {index_path(args.csv)}.")
+    elif args.command == "search":
+        posts = add_post_ids(posts)
+        matches = posts[posts['Post ID'].isin(index.search(args.query))]
+        print(matches[['Name', 'Title', 'Likes', 'Comments']].to_string(index=False))
+    else:
+        posts['Total Engagement'] = (
+            pd.to_numeric(posts['Likes'], errors='coerce').fillna(0)
+            + pd.to_numeric(posts['Comments'], errors='coerce').fillna(0))
+        print(index.keyword_engagement(posts, args.min_posts, args.top).to_string(index=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""File-based SQL warehouse backend for the engagement dashboard.
+
+Instead of pulling a whole posts table into pandas, the dashboard can read
+from a local SQLite warehouse holding any number of communities. Every view
+runs as one aggregate query that returns only the rows it displays, using
+covering indexes on (community, post date) and (community, member) and an
+index on (community, engagement) for the top posts, so the Streamlit process
+never holds the raw posts.
+
+The query methods return the same frames as the compute steps in
+skool_analytics, so the figures and tables render unchanged.
+
+Usage:
+    python skool_warehouse.py load my-community scraped_community_posts_my-community.csv \\
+        --comments scraped_post_comments_my-community.csv
+    python skool_warehouse.py communities
+"""
+import argparse
+import os
+import sqlite3
+import sys
+from contextlib import closing
+
+import pandas as pd
+
+import skool_analytics as analytics
+from skool_community_posts import add_post_ids
+
+DEFAULT_PATH = os.getenv("SKOOL_WAREHOUSE", "skool_warehouse.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    community TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    name TEXT,
+    profile_picture TEXT,
+    level TEXT,
+    post_date TEXT NOT NULL,
+    category TEXT,
+    title TEXT,
+    likes INTEGER NOT NULL,
+    comments INTEGER NOT NULL,
+    date_scraped TEXT,
+    engagement INTEGER GENERATED ALWAYS AS (likes + comments) VIRTUAL,
+    PRIMARY KEY (community, post_id)
+);
+CREATE INDEX IF NOT EXISTS posts_by_date
+    ON posts (community, post_date, category, name, likes, comments);
+CREATE INDEX IF NOT EXISTS posts_by_member
+    ON posts (community, name, post_date);
+CREATE INDEX IF NOT EXISTS posts_by_engagement
+    ON posts (community, engagement, post_date);
+CREATE TABLE IF NOT EXISTS comments (
+    community TEXT NOT NULL,
+    post_id TEXT NOT NULL,
+    commenter TEXT,
+    profile_picture TEXT,
+    comment_date TEXT NOT NULL,
+    replies INTEGER
+);
+CREATE INDEX IF NOT EXISTS comments_by_date
+    ON comments (community, comment_date, commenter);
+"""
+
+# SQL expressions for the start date of each time bucket
+_BUCKET_SQL = {
+    "D": "post_date",
+    "W": "date(post_date, '-' || ((CAST(strftime('%w', post_date) AS INTEGER) + 6) % 7) || ' days')",
+    "M": "substr(post_date, 1, 7) || '-01'",
+}
+
+_METRIC_SQL = {
+    "Posts": "COUNT(*)",
+    "Likes": "SUM(likes)",
+    "Comments": "SUM(comments)",
+    "Total Engagement": "SUM(engagement)",
+}
+
+
+def _month_range(month):
+    """ISO date bounds [start, end) of a 'Month YYYY' filter, or None for 'All'."""
+    if month == 'All':
+        return None
+    start = pd.to_datetime(month, format=analytics.MONTH_FORMAT)
+    end = start + pd.offsets.MonthBegin(1)
+    return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+
+
+class Warehouse:
+    """Posts and comments of many communities in one SQLite file."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = str(path)
+        with closing(self._connect()) as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_xinfo(posts)")}
+            if columns and 'engagement' not in columns:
+                # Warehouses created before the engagement column existed
+                conn.execute("ALTER TABLE posts ADD COLUMN engagement INTEGER"
+                             " GENERATED ALWAYS AS (likes + comments) VIRTUAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _query(self, sql, params=()):
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def _where(self, community, month, date_column='post_date'):
+        clause, params = "community = ?", [community]
+        bounds = _month_range(month)
+        if bounds:
+            clause += f" AND {date_column} >= ? AND {date_column} < ?"
+            params += list(bounds)
+        return clause, params
+
+    # Loading
+
+    def load_posts(self, community, df):
+        """Insert or update a community's scraped posts.
+
+        Posts already in the warehouse are updated by Post ID. Raises
+        ValueError if the table itself holds several posts with one ID, as
+        all but one of them would be lost.
+        """
+        posts = add_post_ids(df.copy())
+        duplicated = posts['Post ID'].duplicated(keep=False)
+        if duplicated.any():
+            raise ValueError(
+                f"{duplicated.sum()} posts share a Post ID with another post in the table,"
+                f" e.g. {posts.loc[duplicated, 'Title'].iloc[0]!r}")
+        posts['Post Date'] = pd.to_datetime(
+            posts['Post Date'], format=analytics.DATE_FORMAT).dt.strftime('%Y-%m-%d')
+        for column in ['Likes', 'Comments']:
+            posts[column] = pd.to_numeric(
+                posts[column], errors='coerce').fillna(0).astype(int)
+        rows = zip(
+            [community] * len(posts), posts['Post ID'], posts['Name'],
+            posts['Profile Picture'], posts.get('Level'), posts['Post Date'],
+            posts['Category'], posts['Title'], posts['Likes'], posts['Comments'],
+            posts.get('Date Scraped'))
+        with closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO posts (community, post_id, name, profile_picture, level,"
+                " post_date, category, title, likes, comments, date_scraped)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ([None if pd.isna(value) else value for value in row] for row in rows))
+        return len(posts)
+
+    def load_comments(self, community, comments_df):
+        """Replace a community's comment threads with a deep-scrape comments table."""
+        comment_dates = pd.to_datetime(
+            comments_df['Comment Date'], format=analytics.DATE_FORMAT).dt.strftime('%Y-%m-%d')
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM comments WHERE community = ?", (community,))
+            conn.executemany(
+                "INSERT INTO comments VALUES (?, ?, ?, ?, ?, ?)",
+                zip([community] * len(comments_df), comments_df['Post ID'],
+                    comments_df['Commenter'], comments_df['Profile Picture'],
+                    comment_dates, comments_df['Replies'].fillna(0).astype(int)))
+        return len(comments_df)
+
+    # Filters
+
+    def communities(self):
+        return self._query(
+            "SELECT DISTINCT community FROM posts ORDER BY community")['community'].tolist()
+
+    def month_options(self, community):
+        """Months with posts, most recent first."""
+        months = self._query(
+            "SELECT DISTINCT substr(post_date, 1, 7) AS month FROM posts"
+            " WHERE community = ? ORDER BY month DESC", (community,))['month']
+        return pd.to_datetime(months, format='%Y-%m').dt.strftime(analytics.MONTH_FORMAT).tolist()
+
+    def has_comments(self, community, month='All'):
+        where, params = self._where(community, month, 'comment_date')
+        with closing(self._connect()) as conn:
+            return conn.execute(
+                f"SELECT EXISTS (SELECT 1 FROM comments WHERE {where})", params).fetchone()[0] == 1
+
+    # Views, mirroring the compute steps in skool_analytics
+
+    def posts_over_time(self, community, month, min_bucket="D",
+                        max_points=analytics.MAX_TIME_BUCKETS):
+        where, params = self._where(community, month)
+        with closing(self._connect()) as conn:
+            start, end = conn.execute(
+                f"SELECT MIN(post_date), MAX(post_date) FROM posts WHERE {where}", params).fetchone()
+        if start is None:
+            return min_bucket, pd.DataFrame(columns=['Period'])
+        bucket = analytics.choose_time_bucket(start, end, min_bucket, max_points)
+        counts = self._query(
+            f"SELECT {_BUCKET_SQL[bucket]} AS Period, category AS Category, COUNT(*) AS Counts"
+            f" FROM posts WHERE {where} GROUP BY Period, Category", params)
+        counts['Period'] = pd.to_datetime(counts['Period'])
+        pivot = counts.pivot(index='Period', columns='Category', values='Counts')
+        return bucket, pivot.fillna(0).astype(int).sort_index().reset_index()
+
+    def category_counts(self, community, month):
+        where, params = self._where(community, month)
+        return self._query(
+            f"SELECT category AS Category, COUNT(*) AS Count FROM posts WHERE {where}"
+            " GROUP BY category ORDER BY Count DESC", params)
+
+    def owner_vs_members(self, community, month, owner_name):
+        where, params = self._where(community, month)
+        with closing(self._connect()) as conn:
+            owner_count, total = conn.execute(
+                f"SELECT COALESCE(SUM(name = ?), 0), COUNT(*) FROM posts WHERE {where}",
+                [owner_name] + params).fetchone()
+        return pd.DataFrame({'User Type': ['Owner', 'Members'],
+                             'Count': [owner_count, total - owner_count]})
+
+    def top_posts(self, community, month, n=5, exclude_name=None):
+        where, params = self._where(community, month)
+        if exclude_name:
+            where += " AND name != ?"
+            params.append(exclude_name)
+        return self._query(
+            "SELECT name AS Name, title AS Title, likes AS Likes, comments AS Comments,"
+            " engagement AS 'Total Engagement'"
+            f" FROM posts WHERE {where} ORDER BY engagement DESC LIMIT ?",
+            params + [n])
+
+    def retention_matrix(self, community, month, weeks=analytics.RETENTION_WEEKS):
+        # Cohorts need every member's first post and their later activity, so
+        # all of the community's activity is read; the month picks the cohorts
+        activity = self._query(
+            "SELECT DISTINCT name AS Name, post_date AS 'Post Date' FROM posts"
+            " WHERE community = ?", (community,))
+        activity['Post Date'] = pd.to_datetime(activity['Post Date'])
+        return analytics.month_cohorts(analytics.retention_matrix(activity, weeks), month)
+
+    def leaderboard(self, community, month, metric='Posts', n=20):
+        if metric == "Comments Given":
+            where, params = self._where(community, month, 'comment_date')
+            sql = (f"SELECT commenter AS Name, MAX(profile_picture) AS 'Profile Picture',"
+                   f" COUNT(*) AS 'Comments Given' FROM comments WHERE {where}"
+                   f" GROUP BY commenter ORDER BY 3 DESC LIMIT ?")
+        elif metric in _METRIC_SQL:
+            where, params = self._where(community, month)
+            sql = (f"SELECT name AS Name, MAX(profile_picture) AS 'Profile Picture',"
+                   f" {_METRIC_SQL[metric]} AS '{metric}' FROM posts WHERE {where}"
+                   f" GROUP BY name ORDER BY 3 DESC LIMIT ?")
+        else:
+            raise ValueError(f"Unknown leaderboard metric: {metric}")
+        board = self._query(sql, params + [n])
+        board.insert(0, 'Rank', board.index + 1)
+        return board[['Rank', 'Name', metric, 'Profile Picture']]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Skool engagement warehouse.")
+    parser.add_argument("--db", default=DEFAULT_PATH)
+    commands = parser.add_subparsers(dest="command", required=True)
+    load = commands.add_parser("load", help="Load a scraped posts CSV")
+    load.add_argument("community")
+    load.add_argument("csv")
+    load.add_argument("--comments", help="Deep-scrape comments CSV of the same community")
+    commands.add_parser("communities", help="List the communities in the warehouse")
+    args = parser.parse_args(argv)
+
+    warehouse = Warehouse(args.db)
+    if args.command == "load":
+        try:
+            loaded = warehouse.load_posts(args.community, analytics.read_table(args.csv))
+        except ValueError as e:
+            print(f"Not loaded: {e}")
+            return 1
+        print(f"Loaded {loaded} posts into {args.db}.")
+        if args.comments:
+            loaded = warehouse.load_comments(args.community, analytics.read_table(args.comments))
+            print(f"Loaded {loaded} comments into {args.db}.")
+    else:
+        print("\n".join(warehouse.communities()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
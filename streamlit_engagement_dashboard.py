@@ -1,244 +1,413 @@
-import plotly.express as px
-import pandas as pd
-import streamlit as st
-import plotly.graph_objects as go
-import openpyxl
-from datetime import datetime, timedelta
+import hashlib
 import os
-from PIL import Image
-import matplotlib.pyplot as plt
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+import skool_analytics as analytics
+from skool_avatar_cache import avatar_cache
+from skool_community_posts import add_post_ids
+from skool_dataset_registry import DatasetRegistry
+from skool_member_index import MemberIndex
+from skool_text_index import TextIndex
+from skool_warehouse import DEFAULT_PATH as WAREHOUSE_PATH, Warehouse
+
+
+# Uploads are parsed once per process into the shared dataset registry, keyed
+# by a fingerprint of the file, and every session viewing the same community
+# reads the same copy. Every view is memoised on that fingerprint (plus the
+# month and owner where relevant), and the other months' views are
+# precomputed in the background once a dataset is on screen. Combined with
+# the fragments below, a widget change only recomputes the views that depend
+# on it. With the warehouse as data source, each view is instead one
+# aggregate SQL query and df is None.
+
+@st.cache_resource
+def get_warehouse(path):
+    return Warehouse(path)
+
+
+def _session_is_alive(session_id):
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
+
+
+@st.cache_resource
+def get_dataset_registry():
+    return DatasetRegistry(is_alive=_session_is_alive)
+
+
+def open_shared_dataset(slot, key=None, loader=None, identifier=None):
+    """Open a dataset from the registry for this session.
+
+    With a key, the dataset is loaded if needed and published under
+    identifier; without one, the dataset last published under identifier is
+    opened. The dataset the session held in the same slot before is released.
+    """
+    registry = get_dataset_registry()
+    session_id = get_script_run_ctx().session_id
+    if key is not None:
+        dataset = registry.open(key, loader, session_id, identifier)
+    elif identifier is not None:
+        dataset = registry.open_identifier(identifier, session_id)
+    else:
+        dataset = None
+    held = st.session_state.setdefault("held_datasets", {})
+    previous = held.pop(slot, None)
+    if previous is not None and (dataset is None or previous != dataset.key):
+        registry.release(previous, session_id)
+    if dataset is not None:
+        held[slot] = dataset.key
+    return dataset
+
+
+def load_posts(file_bytes):
+    """Parse and prepare an uploaded posts table."""
+    return add_post_ids(analytics.prepare_posts(analytics.read_table(file_bytes)))
+
+
+def load_comments(file_bytes):
+    """Parse and prepare an uploaded comments table."""
+    return analytics.prepare_comments(analytics.read_table(file_bytes))
+
+
+@st.cache_resource
+def get_report_warmups():
+    """Warm-ups by dataset, with the sessions viewing each, for the whole process."""
+    return threading.Lock(), {}
+
+
+def warm_up_reports(posts_dataset, comments_dataset, displayed_month=None):
+    """Precompute the other months of the displayed dataset in the background.
+
+    The reports land in the analytics result cache that report_view reads,
+    so switching months is instant once they are done. One warm-up runs per
+    dataset whichever sessions view it, and it is cancelled once none of
+    them does any more.
+    """
+    lock, warmups = get_report_warmups()
+    session_id = get_script_run_ctx().session_id
+    key = (posts_dataset and posts_dataset.key, comments_dataset and comments_dataset.key)
+    with lock:
+        for other_key, (warmup, viewers) in list(warmups.items()):
+            if other_key != key:
+                viewers.discard(session_id)
+            viewers.intersection_update(
+                [viewer for viewer in viewers if _session_is_alive(viewer)])
+            if not viewers:
+                warmup.cancel()
+                del warmups[other_key]
+        if posts_dataset is None:
+            return
+        if key in warmups:
+            warmups[key][1].add(session_id)
+            return
+        df = posts_dataset.data
+        months = [month for month in ['All'] + analytics.month_options(df)
+                  if month != displayed_month]
+        warmup = analytics.ReportWarmup(
+            df, months, comments_df=comments_dataset and comments_dataset.data,
+            fingerprint=posts_dataset.key, comments_fingerprint=key[1])
+        warmups[key] = (warmup.start(), {session_id})
+
+
+def report_view(name, owner=None):
+    """One view of the current dataset and month, from the analytics result cache."""
+    report = analytics.compute_report(
+        posts_dataset.data, month_filter, owner,
+        comments_dataset and comments_dataset.data,
+        fingerprint=dataset_key, comments_fingerprint=comments_key)
+    return report.get(name)
+
+
+TIME_VIEWS = {"D": "posts_by_day", "W": "posts_by_week"}
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_posts_over_time_figure(view_key, min_bucket):
+    if warehouse is not None:
+        bucket, counts = warehouse.posts_over_time(
+            warehouse_community, month_filter, min_bucket)
+    else:
+        bucket, counts = report_view(TIME_VIEWS[min_bucket])
+    return bucket, analytics.posts_over_time_figure(bucket, counts)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_category_figure(view_key):
+    if warehouse is not None:
+        counts = warehouse.category_counts(warehouse_community, month_filter)
+    else:
+        counts = report_view("categories")
+    return analytics.category_figure(counts)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_owner_vs_members_figure(view_key, owner_name):
+    if warehouse is not None:
+        counts = warehouse.owner_vs_members(warehouse_community, month_filter, owner_name)
+    else:
+        counts = report_view("owner_vs_members", owner_name)
+    return analytics.owner_vs_members_figure(counts)
+
+
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_retention_figure(view_key):
+    if warehouse is not None:
+        retention = warehouse.retention_matrix(warehouse_community, month_filter)
+    else:
+        retention = report_view("retention")
+    if retention.empty:
+        return None
+    return analytics.retention_figure(retention)
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_top_posts(view_key, exclude_name):
+    if warehouse is not None:
+        return warehouse.top_posts(warehouse_community, month_filter,
+                                   exclude_name=exclude_name)
+    if exclude_name:
+        return report_view("top_posts_excluding_owner", exclude_name)
+    return report_view("top_posts")
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cached_leaderboard_html(view_key, metric):
+    if warehouse is not None:
+        leaderboard = warehouse.leaderboard(warehouse_community, month_filter, metric)
+    else:
+        leaderboard = report_view(f"leaderboard:{metric}")
+
+    # Avatars are inlined from the local thumbnail cache instead of hot-linked
+    avatars = avatar_cache()
+    avatars.prefetch(leaderboard['Profile Picture'])
+    return analytics.leaderboard_html(leaderboard, metric, avatars.thumbnail_uri)
+
+
+# Shared rather than copied per rerun, so type-ahead lookups stay instant
+# The member and text indexes are kept with their dataset in the registry;
+# the member index covers every month and filters per lookup
+def member_index():
+    return posts_dataset.aggregate("member_index", MemberIndex)
+
+
+def text_index():
+    # Saved on disk under the upload's fingerprint, so it is only tokenised
+    # once per file; the month filter is applied to the results
+    return posts_dataset.aggregate(
+        "text_index", lambda posts: TextIndex.for_upload(posts_dataset.key, posts))
+
 
-# Input fields for uploading new data
-st.sidebar.subheader("Upload Community Data CSV")
-uploaded_file = st.sidebar.file_uploader("Upload CSV File", type="csv")
+@st.cache_data(max_entries=32, show_spinner=False)
+def cached_keyword_engagement(view_key, _df):
+    return text_index().keyword_engagement(_df)
 
-if uploaded_file is not None:
+
+def file_fingerprint(file_bytes):
+    return hashlib.sha1(file_bytes).hexdigest()
+
+
+@st.cache_resource
+def get_comparison_pool():
+    # Threads rather than processes: Streamlit runs this script as __main__,
+    # which spawned workers would re-run, and forking the server is unsafe.
+    # Decompression and Parquet decoding release the GIL.
+    return ThreadPoolExecutor(max_workers=os.cpu_count())
+
+
+def compare_communities_page():
+    """Side-by-side metrics of several uploaded communities.
+
+    The datasets are parsed and summarised in parallel on a shared pool, and
+    the summaries are cached by file content, so adding a community only
+    loads the new dataset and changing an owner name reloads none.
+    """
+    st.markdown("<h1 style='text-align: center;'>Community Comparison</h1>",
+                unsafe_allow_html=True)
+    uploaded_files = st.sidebar.file_uploader(
+        "Upload Community Files", type=analytics.TABLE_EXTENSIONS,
+        accept_multiple_files=True,
+        help="One scraped posts CSV (optionally compressed) or Parquet file per community.")
+    if len(uploaded_files) < 2:
+        st.warning("Please upload at least two community files to compare.")
+        return
+
+    sources = []
+    with st.sidebar.expander("Community Owners"):
+        for uploaded in uploaded_files:
+            community = uploaded.name.split('.')[0]
+            if any(community == existing for existing, _, _ in sources):
+                community = f"{community} ({len(sources) + 1})"
+            owner = st.text_input(community, key=f"compare_owner_{community}")
+            sources.append((community, uploaded.getvalue(), owner or None))
+
+    with st.spinner("Loading communities, please wait..."):
+        try:
+            comparison = analytics.compare_communities(
+                sources, executor=get_comparison_pool())
+        except Exception as e:
+            st.error(f"Error reading community files: {e}")
+            return
+
+    st.dataframe(comparison, column_config={
+        'Owner Share': st.column_config.NumberColumn(format="%.1f%%")},
+        use_container_width=True)
+    if comparison['Owner Share'].isna().all():
+        st.info("Enter the community owners' names to compare owner share.")
+    for metric, column in zip(analytics.COMPARISON_METRICS, st.columns(3)):
+        with column:
+            st.markdown(f"<h3 style='text-align: center;'>{metric}</h3>", unsafe_allow_html=True)
+            if comparison[metric].notna().any():
+                st.plotly_chart(analytics.comparison_figure(comparison, metric),
+                                use_container_width=True)
+
+
+# Several communities can be compared instead of exploring one
+if st.sidebar.radio("View", ["Single Community", "Compare Communities"]) == "Compare Communities":
+    open_shared_dataset("posts")
+    open_shared_dataset("comments")
+    warm_up_reports(None, None)
+    compare_communities_page()
+    st.stop()
+
+# Communities loaded with `python skool_warehouse.py load` can be browsed
+# without uploading their CSVs
+data_source = "Upload CSV"
+if os.path.exists(WAREHOUSE_PATH):
+    data_source = st.sidebar.radio("Data Source", ["Upload CSV", "Warehouse"])
+
+warehouse = None
+warehouse_community = None
+uploaded_file = uploaded_comments_file = None
+if data_source == "Warehouse":
+    warehouse = get_warehouse(WAREHOUSE_PATH)
+    communities = warehouse.communities()
+    requested = st.query_params.get("community")
+    warehouse_community = st.sidebar.selectbox(
+        "Community", communities,
+        index=communities.index(requested) if requested in communities else 0)
+    open_shared_dataset("posts")
+    open_shared_dataset("comments")
+else:
+    # Input fields for uploading new data
+    st.sidebar.subheader("Upload Community Data CSV")
+    # Exports may also be gzip/zstd-compressed (.csv.gz, .csv.zst) or Parquet,
+    # which upload several times faster than plain CSV
+    uploaded_file = st.sidebar.file_uploader(
+        "Upload CSV File", type=analytics.TABLE_EXTENSIONS,
+        help="A scraped posts CSV, optionally compressed (.csv.gz, .csv.zst), or Parquet.")
+    uploaded_comments_file = st.sidebar.file_uploader(
+        "Upload Comments CSV (optional)", type=analytics.TABLE_EXTENSIONS,
+        help="The scraped_post_comments_*.csv written by a deep scrape.")
+
+dataset_key = None
+df = None
+posts_dataset = comments_dataset = None
+requested_community = st.query_params.get("community")
+if warehouse_community is not None:
+    st.query_params["community"] = warehouse_community
+    # Reloading the warehouse changes its mtime and invalidates the cached views
+    dataset_key = ("warehouse", warehouse_community, os.path.getmtime(WAREHOUSE_PATH))
+elif warehouse is not None:
+    st.error("The warehouse has no communities yet.")
+elif uploaded_file is not None:
     # Extract community identifier from file name for dynamic URL
     community_identifier = uploaded_file.name.split('.')[0]
-    st.experimental_set_query_params(community=community_identifier)
+    st.query_params["community"] = community_identifier
     with st.spinner("Loading data, please wait..."):
         try:
-            df = pd.read_csv(uploaded_file)
+            file_bytes = uploaded_file.getvalue()
+            posts_dataset = open_shared_dataset(
+                "posts", file_fingerprint(file_bytes),
+                lambda: load_posts(file_bytes), community_identifier)
         except Exception as e:
             st.error(f"Error reading CSV file: {e}")
-            df = None
+    if uploaded_comments_file is not None:
+        try:
+            file_bytes = uploaded_comments_file.getvalue()
+            comments_dataset = open_shared_dataset(
+                "comments", file_fingerprint(file_bytes),
+                lambda: load_comments(file_bytes), f"{community_identifier}/comments")
+        except Exception as e:
+            st.error(f"Error reading comments CSV file: {e}")
+    else:
+        open_shared_dataset("comments")
+elif requested_community is not None:
+    # Another session already uploaded this community's data
+    posts_dataset = open_shared_dataset("posts", identifier=requested_community)
+    comments_dataset = open_shared_dataset(
+        "comments", identifier=f"{requested_community}/comments")
+    if posts_dataset is None:
+        st.error(f"No data for {requested_community} is loaded; please upload its CSV file.")
 else:
+    open_shared_dataset("posts")
+    open_shared_dataset("comments")
     st.error("Please upload a CSV file to proceed.")
-    df = None
 
-# Only proceed if df is defined
-if df is not None:
-    # Convert Post Date to datetime
-    try:
-        df['Post Date'] = pd.to_datetime(df['Post Date'], format="%d/%m/%Y")
-    except Exception as e:
-        st.error(f"Error converting Post Date: {e}")
-        st.stop()  # Stop execution if no valid data is available
+if posts_dataset is not None:
+    dataset_key = posts_dataset.key
+    df = posts_dataset.data
 
-st.markdown("""
-    <style>
-        @media print {
-            h1, h2, h3, h4, h5, h6, p, div, table, thead, tbody, tfoot, tr, th, td {
-                page-break-inside: avoid;
-            }
-            .page-break {
-                page-break-before: always;
-            }
-            .chart-container {
-                page-break-inside: avoid;
-                page-break-before: auto;
-                page-break-after: auto;
-                margin-bottom: 20px; /* Reduced spacing for printing */
-            }
-            body {
-                -webkit-print-color-adjust: exact;
-                font-size: 14px; /* Adjust font size for readability in print */
-            }
-            table {
-                page-break-inside: avoid;
-                margin-bottom: 20px;
-            }
-        }
-        body {
-            font-family: Arial, sans-serif;
-        }
-        h1 {
-            margin-bottom: 0px !important;
-            text-align: center;
-            font-weight: bold;
-            font-size: 28px; /* Larger font for main title */
-        }
-        h2 {
-            text-align: center;
-            font-weight: bold;
-            font-size: 22px;
-            margin-bottom: 5px;
-            margin-top: 10px;
-        }
-        h3 {
-            text-align: center;
-            margin-top: 0px !important;
-            margin-bottom: 10px;
-            font-size: 18px; /* Consistent subheading size */
-        }
-        h4.leaderboard-header {
-            text-align: center;
-            margin-top: 5px;
-            margin-bottom: 5px;
-            font-weight: bold;
-            font-size: 16px;
-        }
-        .leaderboard-table {
-            margin-top: 0px;
-            page-break-inside: avoid;
-        }
-        table.custom-table {
-            width: 100%;
-            border-collapse: collapse;
-            margin-top: 10px;
-            margin-bottom: 10px;
-        }
-        th, td {
-            border: 1px solid #444;
-            padding: 8px;
-            text-align: center;
-            font-size: 14px;
-        }
-        th {
-            background-color: #444;
-            color: white;
-            height: 40px;
-            text-align: center;
-        }
-        td img {
-            width: 25px;
-            height: 25px;
-            border-radius: 50%;
-        }
-        th.rank, td.rank {
-            width: 60px;
-        }
-        th.profile-picture, td.profile-picture {
-            width: 60px;
-        }
-        th.name, td.name {
-            width: 200px;
-        }
-        th.metric, td.metric {
-            width: 50px;
-        }
-        caption {
-            font-size: 2em;
-            margin-bottom: 10px;
-            font-weight: bold;
-            text-align: center;
-        }
-    </style>
-""", unsafe_allow_html=True)
+comments_df = None
+comments_key = None
+if comments_dataset is not None:
+    comments_key = comments_dataset.key
+    comments_df = comments_dataset.data
+
+st.markdown(analytics.DASHBOARD_CSS, unsafe_allow_html=True)
 
 # Streamlit App
 st.markdown("<h1 style='text-align: center; margin-bottom: 0px;'>Skool Community Post Engagement Dashboard</h1>",
             unsafe_allow_html=True)
 
 # Month Filter
-if df is not None:
-    month_filter = st.sidebar.selectbox("Select Month", options=[
-        'All'] + df['Post Date'].dt.strftime('%B %Y').unique().tolist())
-    if month_filter != 'All':
-        df = df[df['Post Date'].dt.strftime('%B %Y') == month_filter]
+if warehouse_community is not None:
+    month_filter = st.sidebar.selectbox(
+        "Select Month", options=['All'] + warehouse.month_options(warehouse_community))
+    has_comments_given = warehouse.has_comments(warehouse_community, month_filter)
+elif df is not None:
+    month_filter = st.sidebar.selectbox(
+        "Select Month", options=['All'] + analytics.month_options(df))
+    df = analytics.filter_month(df, month_filter)
+
+    # Comments from the deep scrape follow the same month filter
+    if comments_df is not None and not comments_df.empty:
+        comments_df = analytics.filter_month(
+            comments_df, month_filter, date_column='Comment Date')
+    has_comments_given = comments_df is not None and not comments_df.empty
 else:
     st.warning("Please upload a valid CSV file to proceed.")
+    st.stop()
+
+# Identifies the data every view below is computed from
+view_key = (dataset_key, comments_key, month_filter)
 
 
 # Posts by Day
 
 def posts_by_day(df):
-    df['Day'] = df['Post Date'].dt.date
-    daily_posts = df.groupby(
-        ['Day', 'Category']).size().reset_index(name='Counts')
-
-    st.markdown("<h2 style='text-align: center;'>Posts by Day</h2>",
+    # Long ranges are bucketed by week or month to keep the chart small
+    bucket, fig = cached_posts_over_time_figure(view_key, "D")
+    st.markdown(f"<h2 style='text-align: center;'>Posts by {analytics.BUCKET_LABELS[bucket]}</h2>",
                 unsafe_allow_html=True)
 
-    # Create a pivot table for stacked bar chart
-    daily_pivot = daily_posts.pivot(
-        index='Day', columns='Category', values='Counts').fillna(0)
-    daily_pivot.reset_index(inplace=True)
-
-    # Create Plotly figure for stacked bar chart
-    fig = go.Figure()
-    color_sequence = px.colors.qualitative.Plotly
-    for i, category in enumerate(daily_pivot.columns[1:]):
-        fig.add_trace(go.Bar(
-            x=daily_pivot['Day'],
-            y=daily_pivot[category],
-            name=category,
-            marker_color=color_sequence[i % len(color_sequence)],
-            hovertext=daily_pivot.apply(lambda row: f"{row['Day']}, {
-                                        int(row[category])}", axis=1),
-            hoverinfo='text'
-        ))
-
-    # Update layout for better readability
-    fig.update_layout(
-        xaxis=dict(title="Day", tickfont=dict(size=16)),
-        yaxis=dict(title="Number of Posts", titlefont=dict(
-            size=16), tickfont=dict(size=16)),
-        barmode='stack',
-        template="plotly_dark",
-        margin=dict(t=50, b=50),
-        height=400
-    )
-
     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
     st.plotly_chart(fig)
     st.markdown("</div>", unsafe_allow_html=True)
+    return bucket
 
 # Posts by Week
 
 
-def posts_by_time_period(df):
-    df['Week'] = df['Post Date'].dt.isocalendar().week
-    df['Year'] = df['Post Date'].dt.year
-    weekly_posts = df.groupby(
-        ['Year', 'Week', 'Category']).size().reset_index(name='Counts')
-    weekly_posts['Week_Start_Date'] = weekly_posts.apply(
-        lambda row: datetime.strptime(f'{row.Year}-W{row.Week}-1', "%Y-W%W-%w"), axis=1
-    )
-
-    st.markdown("<h2 style='text-align: center;'>Posts by Week</h2>",
+def posts_by_time_period(df, day_chart_bucket):
+    bucket, fig = cached_posts_over_time_figure(view_key, "W")
+    if bucket == day_chart_bucket:
+        return  # the range is long enough that both charts would be identical
+    st.markdown(f"<h2 style='text-align: center;'>Posts by {analytics.BUCKET_LABELS[bucket]}</h2>",
                 unsafe_allow_html=True)
 
-    # Create a pivot table for stacked bar chart
-    weekly_pivot = weekly_posts.pivot(
-        index=['Year', 'Week', 'Week_Start_Date'], columns='Category', values='Counts').fillna(0)
-    weekly_pivot.reset_index(inplace=True)
-
-    # Create Plotly figure for stacked bar chart
-    fig = go.Figure()
-    color_sequence = px.colors.qualitative.Plotly
-    for i, category in enumerate(weekly_pivot.columns[3:]):
-        fig.add_trace(go.Bar(
-            x=weekly_pivot['Week'],
-            y=weekly_pivot[category],
-            name=category,
-            marker_color=color_sequence[i % len(color_sequence)],
-            hovertext=weekly_pivot.apply(
-                lambda row: f"w/c {row['Week_Start_Date'].strftime('%d %b %Y')}, {int(row[category])}", axis=1),
-            hoverinfo='text'
-        ))
-
-    # Update layout for better readability
-    fig.update_layout(
-        xaxis=dict(title="Week", tickfont=dict(size=16)),
-        yaxis=dict(title="Number of Posts", titlefont=dict(
-            size=16), tickfont=dict(size=16)),
-        barmode='stack',
-        template="plotly_dark",
-        margin=dict(t=50, b=50),
-        height=400
-    )
-
     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
     st.plotly_chart(fig)
     st.markdown("</div>", unsafe_allow_html=True)
@@ -246,55 +415,28 @@ def posts_by_time_period(df):
 
 # Top Performing Posts
 
-def top_performing_posts(df):
-    df['Total Engagement'] = df['Likes'].astype(
-        int) + df['Comments'].astype(int)
-    top_posts = df.sort_values(by='Total Engagement', ascending=False).head(10)
+def top_performing_posts(df, community_owner):
     st.markdown("<div class='page-break'><h2 style='text-align: center;'>Top Performing Posts</h2></div>",
                 unsafe_allow_html=True)
 
     # Top 5 Performing Posts by Total Engagement
-    top_5_posts = top_posts.head(5)
     st.markdown("<h3 style='text-align: center;'>Top 5 Performing Posts by Total Engagement</h3>",
                 unsafe_allow_html=True)
-    st.table(top_5_posts[['Name', 'Title', 'Likes',
-             'Comments', 'Total Engagement']].reset_index(drop=True))
+    st.table(cached_top_posts(view_key, None))
 
     # Top 5 Performing Posts by Total Engagement (Excluding Community Owner)
-    community_owner = st.sidebar.text_input(
-        "Enter Community Owner Name to Exclude:")
     if community_owner:
-        top_posts_excluding_owner = df[df['Name'] != community_owner].sort_values(
-            by='Total Engagement', ascending=False).head(10)
-        top_5_posts_excluding_owner = top_posts_excluding_owner.head(5)
         st.markdown(
             "<h3 style='text-align: center;'>Top 5 Performing Posts by Total Engagement (Excluding Community Owner)</h3>", unsafe_allow_html=True)
-        st.table(top_5_posts_excluding_owner[[
-                 'Name', 'Title', 'Likes', 'Comments', 'Total Engagement']].reset_index(drop=True))
+        st.table(cached_top_posts(view_key, community_owner))
 
 # Posts by Category
 
 
 def posts_by_category(df):
-    category_count = df['Category'].value_counts(
-    ).sort_values(ascending=False).reset_index()
-    category_count.columns = ['Category', 'Count']
-
     st.markdown("<div class='chart-container'><h2 style='text-align: center;'>Posts by Category</h2></div>",
                 unsafe_allow_html=True)
-
-    # Use Plotly to create a bar chart with customization and emoji support
-    fig = px.bar(category_count, x='Category', y='Count', text='Count',
-                 color='Category', color_discrete_sequence=px.colors.qualitative.Plotly)
-    fig.update_layout(
-        xaxis_tickangle=-45,
-        yaxis_title="Number of Posts",
-        xaxis_title="Categories",
-        template="plotly_dark",
-        font=dict(size=16),
-        margin=dict(t=50, b=100)
-    )
-    fig.update_traces(texttemplate='%{text}', textposition='outside')
+    fig = cached_category_figure(view_key)
 
     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
     st.plotly_chart(fig)
@@ -303,91 +445,116 @@ def posts_by_category(df):
 # Add Pie Chart for Posts by Owner vs Members
 
 
-def posts_by_owner_vs_members(df):
+def posts_by_owner_vs_members(df, owner_name):
     st.markdown("<div class='chart-container'><h2 style='text-align: center;'>Posts by Owner vs Members</h2></div>", unsafe_allow_html=True)
 
-    owner_name = st.sidebar.text_input(
-        "Enter Community Owner Name for Pie Chart:")
-    if owner_name and df is not None:
+    if owner_name:
         try:
-            # Check if the 'Name' column exists
-            if 'Name' in df.columns:
-                owner_posts_count = df[df['Name'] == owner_name].shape[0]
-                members_posts_count = df[df['Name'] != owner_name].shape[0]
-
-                # Create data for the pie chart
-                pie_data = pd.DataFrame({
-                    'User Type': ['Owner', 'Members'],
-                    'Count': [owner_posts_count, members_posts_count]
-                })
-
-                # Create and display the pie chart
-                pie_fig = px.pie(pie_data, values='Count', names='User Type',
-                                 color_discrete_sequence=px.colors.qualitative.Plotly)
-                pie_fig.update_traces(
-                    textposition='inside',
-                    textinfo='percent+label',
-                    textfont_size=18,  # Make percentage text bigger
-                    textfont_color='white'  # Set text color to white
-                )
-                pie_fig.update_layout(showlegend=False)  # Remove the legend
-                st.plotly_chart(pie_fig)
-            else:
-                st.error("The required column 'Name' does not exist in the data.")
+            st.plotly_chart(
+                cached_owner_vs_members_figure(view_key, owner_name))
         except Exception as e:
             st.error(f"An error occurred while generating the pie chart: {e}")
     else:
-        st.warning(
-            "Please enter a valid community owner name and ensure a CSV file is uploaded.")
+        st.warning("Please enter the community owner name.")
+
+
+# Both owner-dependent views share one owner setting and rerun on their own
+# when it changes, without recomputing the rest of the dashboard
+
+@st.fragment
+def owner_dependent_views(df):
+    community_owner = st.text_input(
+        "Community Owner Name:", key="community_owner",
+        help="Used for the owner vs members chart and to exclude the owner from the top posts.")
+    posts_by_owner_vs_members(df, community_owner)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+    # Top Performing Posts - Page 3
+    st.markdown("<div class='full-page'>", unsafe_allow_html=True)
+    top_performing_posts(df, community_owner)
 
 # Users Engagement Leaderboard
 
 
 def users_engagement_leaderboard(df, metric='Posts'):
-    if metric == "Posts":
-        leaderboard = df['Name'].value_counts().reset_index()
-        leaderboard.columns = ['Name', 'Posts']
-    elif metric == "Likes":
-        leaderboard = df.groupby('Name')['Likes'].sum(
-        ).sort_values(ascending=False).reset_index()
-    elif metric == "Comments":
-        leaderboard = df.groupby('Name')['Comments'].sum(
-        ).sort_values(ascending=False).reset_index()
-    elif metric == "Total Engagement":
-        df['Total Engagement'] = df['Likes'].astype(
-            int) + df['Comments'].astype(int)
-        leaderboard = df.groupby('Name')['Total Engagement'].sum(
-        ).sort_values(ascending=False).reset_index()
-
-    leaderboard = leaderboard.merge(
-        df[['Name', 'Profile Picture']].drop_duplicates(), on='Name', how='left').head(20)
-    leaderboard.reset_index(drop=True, inplace=True)
-    leaderboard.insert(0, 'Rank', leaderboard.index + 1)
-
-    # Display leaderboard in the same format as previously with profile pictures
-    st.write("<style>"
-             "table {width: 100%; border-collapse: collapse;}"
-             "th, td {border: 1px solid #444; padding: 8px; text-align: center; font-size: 14px;}"
-             "th {background-color: #444; color: white; height: 40px; text-align: center;}"
-             "td img {width: 25px; height: 25px; border-radius: 50%;}"
-             "th.rank, td.rank {width: 60px;}"
-             "th.profile-picture, td.profile-picture {width: 60px;}"
-             "th.name, td.name {width: 200px;}"
-             "th.metric, td.metric {width: 50px;}"
-             "caption {font-size: 2em; margin-bottom: 10px; font-weight: bold; text-align: center;}"
-             "</style>", unsafe_allow_html=True)
-    st.write("<div class='no-page-break' style='margin-top: 5px;'><table class='custom-table no-page-break'>",
+    st.write(analytics.LEADERBOARD_CSS, unsafe_allow_html=True)
+    st.write(cached_leaderboard_html(view_key, metric),
              unsafe_allow_html=True)
-    st.write("<tbody>", unsafe_allow_html=True)
-    for _, row in leaderboard.iterrows():
-        st.write(f"<tr>"
-                 f"<td class='rank'>{row['Rank']}</td>"
-                 f"<td class='profile-picture'><img src='{
-                     row['Profile Picture']}'></td>"
-                 f"<td class='name'>{row['Name']}</td>"
-                 f"<td class='metric'>{row[metric]}</td>"
-                 f"</tr>", unsafe_allow_html=True)
-    st.write("</tbody></table></div>", unsafe_allow_html=True)
+
+
+# Member Retention
+
+def member_retention(df):
+    st.markdown("<h2 style='text-align: center;'>Member Retention</h2>", unsafe_allow_html=True)
+    st.markdown("<h3 style='text-align: center;'>Members Posting Again, by Week of First Post</h3>",
+                unsafe_allow_html=True)
+    fig = cached_retention_figure(view_key)
+    if fig is None:
+        st.info("No members made their first post in this period.")
+        return
+    st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
+    st.plotly_chart(fig)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+
+# Member Search
+
+@st.fragment
+def member_search(month):
+    st.markdown("<h2 style='text-align: center;'>Member Search</h2>", unsafe_allow_html=True)
+    index = member_index()
+    query = st.text_input("Search Member:", key="member_search",
+                          placeholder=f"Type a name ({index.member_count(month)} members)")
+    matches = index.search(query, month=month)
+    if not query:
+        return
+    if not matches:
+        st.info("No member matches that name.")
+        return
+    member = st.selectbox("Member", matches)
+    profile = index.profile(member, month)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Posts", int(profile['Posts']))
+    col2.metric("Likes", int(profile['Likes']))
+    col3.metric("Comments", int(profile['Comments']))
+    col4.metric("Avg Engagement", profile['Avg Engagement'])
+    st.write(f"First post {profile['First Post']:%d/%m/%Y}, last post "
+             f"{profile['Last Post']:%d/%m/%Y}. Level {profile['Level']} "
+             f"({int(profile['Level Changes'])} level changes).")
+
+    category_mix = index.categories(member, month)
+    st.bar_chart(category_mix[category_mix > 0])
+    st.dataframe(index.post_history(member, month), hide_index=True)
+
+
+# Keyword Search and Engagement by Keyword
+
+@st.fragment
+def keyword_search(df):
+    st.markdown("<h2 style='text-align: center;'>Keyword Search</h2>", unsafe_allow_html=True)
+    query = st.text_input("Search Posts:", key="keyword_search",
+                          help="Finds posts whose title or description contains every word.")
+    if not query:
+        return
+    post_ids = text_index().search(query)
+    matches = df[df['Post ID'].isin(post_ids)].sort_values(
+        'Total Engagement', ascending=False)
+    st.write(f"{len(matches)} matching posts.")
+    st.dataframe(matches[['Name', 'Post Date', 'Title', 'Likes', 'Comments',
+                          'Total Engagement']], hide_index=True)
+
+
+def engagement_by_keyword(df):
+    st.markdown("<h2 style='text-align: center;'>Engagement by Keyword</h2>", unsafe_allow_html=True)
+    st.markdown("<h3 style='text-align: center;'>Average Engagement per Post, Keywords in 5+ Posts</h3>",
+                unsafe_allow_html=True)
+    keywords = cached_keyword_engagement(view_key, df)
+    if keywords.empty:
+        st.info("No keyword appears in enough posts yet.")
+    else:
+        st.table(keywords)
+
 
 # Run Analysis in Streamlit
 
@@ -396,19 +563,15 @@ st.markdown("<div class='full-page'>", unsafe_allow_html=True)
 
 # Charts and Headers - Page 1
 st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-posts_by_day(df)
-posts_by_time_period(df)
+day_chart_bucket = posts_by_day(df)
+posts_by_time_period(df, day_chart_bucket)
 st.markdown("</div>", unsafe_allow_html=True)
 
-# Posts by Category and Posts by Owner vs Members - Page 2
+# Posts by Category and Posts by Owner vs Members - Page 2, then
+# Top Performing Posts - Page 3
 st.markdown("<div class='page-break full-page'>", unsafe_allow_html=True)
 posts_by_category(df)
-posts_by_owner_vs_members(df)
-st.markdown("</div>", unsafe_allow_html=True)
-
-# Top Performing Posts - Page 3
-st.markdown("<div class='full-page'>", unsafe_allow_html=True)
-top_performing_posts(df)
+owner_dependent_views(df)
 st.markdown("</div>", unsafe_allow_html=True)
 
 # User Engagement Leaderboards - Page 4
@@ -465,6 +628,34 @@ with col4:
 # Close page-break-inside: avoid div
 st.markdown("</div>", unsafe_allow_html=True)
 
+# Members ranked by the comments they gave, available after a deep scrape
+if has_comments_given:
+    st.markdown("<div style='page-break-before: always; page-break-inside: avoid;'>",
+                unsafe_allow_html=True)
+    st.markdown("<h2 style='text-align: center; margin-bottom: 5px;'>User Engagement Leaderboard</h2>",
+                unsafe_allow_html=True)
+    st.markdown("<h4 class='leaderboard-header' style='text-align: center;'>Comments Given</h4>",
+                unsafe_allow_html=True)
+    st.markdown("<div class='leaderboard-table'>", unsafe_allow_html=True)
+    users_engagement_leaderboard(df, metric='Comments Given')
+    st.markdown("</div>", unsafe_allow_html=True)
+    st.markdown("</div>", unsafe_allow_html=True)
+
+# Cohort retention - Page 6
+st.markdown("<div class='page-break full-page'>", unsafe_allow_html=True)
+member_retention(df)
+st.markdown("</div>", unsafe_allow_html=True)
+
+# Member and keyword lookups need the posts in memory, so they are only
+# offered for uploads
+if df is not None:
+    member_search(month_filter)
+    keyword_search(df)
+    engagement_by_keyword(df)
+
+# The other months are computed once this one is on screen
+warm_up_reports(posts_dataset, comments_dataset, month_filter)
+
 # Add call to action for actionable insights with reduced top margin
 st.markdown("""
     <p style='margin-top: 10px; text-align: center; font-size: 16px;'>